@@ -3,7 +3,7 @@
 
 {
     'name': 'POS Lot Selection',
-    'version': '11.0.1.0.0',
+    'version': '11.0.1.1.0',
     'category': 'Point of Sale',
     'author': 'Tecnativa,'
               'Odoo Community Association (OCA)',
@@ -14,6 +14,7 @@
     ],
     'data': [
         'templates/assets.xml',
+        'views/pos_config_view.xml',
     ],
     'qweb': [
         'static/src/xml/pos.xml'
@@ -0,0 +1,2 @@
+from . import pos_config
+from . import stock_quant
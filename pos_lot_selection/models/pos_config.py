@@ -0,0 +1,38 @@
+# Copyright 2018 Tecnativa S.L. - David Vidal
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import fields, models
+
+
+class PosConfig(models.Model):
+    _inherit = 'pos.config'
+
+    lot_cache = fields.Boolean(
+        string='Preload Lots',
+        help="Load the lots available in the stock location when the "
+             "session is opened and refresh them in background, so that lot "
+             "selection is instant and works offline.",
+    )
+    lot_location_ids = fields.Many2many(
+        comodel_name='stock.location',
+        string='Additional Lot Locations',
+        domain=[('usage', '=', 'internal')],
+        help="Lots available in these locations, or in their children, are "
+             "also proposed in the PoS, besides the ones of the stock "
+             "location of the PoS and its children.",
+    )
+    lot_sort_order = fields.Selection(
+        selection=[
+            ('name', 'Lot Name'),
+            ('qty', 'Available Quantity'),
+            ('fefo', 'First Expired First Out'),
+            ('expiry', 'Expiration Date'),
+        ],
+        string='Lots Order',
+        default='name',
+        required=True,
+        help="Order of the lots proposed in the PoS. First Expired First "
+             "Out uses the removal date of the lots and Expiration Date "
+             "their end of life date, both set by the product_expiry "
+             "module.",
+    )
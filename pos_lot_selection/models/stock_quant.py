@@ -0,0 +1,135 @@
+# Copyright 2018 Tecnativa S.L. - David Vidal
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from collections import OrderedDict
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+# Changes are looked up a bit before the cursor, so that quants written by
+# transactions still running when the cursor was taken aren't missed
+LOT_CACHE_OVERLAP = 60
+
+
+class StockQuant(models.Model):
+    _inherit = 'stock.quant'
+
+    @api.model
+    def _get_pos_lots(self, location_ids, product_ids=None, lot_names=None):
+        """Available quantity of each lot in some locations and their
+        children, summed in SQL and without the reserved quantities, with the
+        lot dates used to sort them when product_expiry is installed.
+
+        :param location_ids: id or list of ids of the locations
+        :param lot_names: if given, only look these lots up
+        :return: dict {product id: [{'name', 'qty', 'removal_date',
+            'life_date', 'locations'}]}, ``locations`` being the breakdown
+            of the quantity by location as a list of {'name', 'qty'}
+        """
+        if isinstance(location_ids, int):
+            location_ids = [location_ids]
+        domain = [
+            ('location_id', 'child_of', location_ids),
+            ('lot_id', '!=', False),
+        ]
+        if product_ids is not None:
+            domain.append(('product_id', 'in', product_ids))
+        if lot_names is not None:
+            domain.append(('lot_id.name', 'in', lot_names))
+        quantities = OrderedDict()
+        for data in self.read_group(
+                domain, ['product_id', 'lot_id', 'location_id', 'quantity',
+                         'reserved_quantity'],
+                ['product_id', 'lot_id', 'location_id'], lazy=False):
+            quantity = data['quantity'] - data['reserved_quantity']
+            if quantity > 0:
+                quantities.setdefault(
+                    (data['product_id'][0], data['lot_id'][0]), []).append(
+                    (data['location_id'], quantity))
+        lots = self.env['stock.production.lot'].browse(
+            [x[1] for x in quantities])
+        date_fields = [
+            x for x in ('removal_date', 'life_date') if x in lots._fields]
+        lot_data = dict(
+            (x['id'], x) for x in lots.read(['name'] + date_fields))
+        res = {}
+        for (product_id, lot_id), locations in quantities.items():
+            locations.sort(key=lambda x: -x[1])
+            res.setdefault(product_id, []).append({
+                'name': lot_data[lot_id]['name'],
+                'qty': sum(x[1] for x in locations),
+                'removal_date': lot_data[lot_id].get('removal_date', False),
+                'life_date': lot_data[lot_id].get('life_date', False),
+                'locations': [
+                    {'name': location[1], 'qty': quantity}
+                    for location, quantity in locations],
+            })
+        return res
+
+    @api.model
+    def get_pos_lot_availability(self, product_id, location_ids):
+        """:return: list of the available lots, see ``_get_pos_lots``"""
+        return self._get_pos_lots(
+            location_ids, [product_id]).get(product_id, [])
+
+    @api.model
+    def get_pos_lot_names_availability(
+            self, product_id, lot_names, location_ids):
+        """Check many lots of a product at once, for instance serial numbers
+        scanned in bulk.
+
+        :return: list of the available lots among ``lot_names``, see
+            ``_get_pos_lots``
+        """
+        return self._get_pos_lots(
+            location_ids, [product_id], lot_names).get(product_id, [])
+
+    @api.model
+    def get_pos_lot_cache(self, location_ids):
+        """Lots available in some locations for all the products, to preload
+        the PoS lot cache.
+
+        :return: dict with the cursor to give to ``get_pos_lot_changes`` and
+            the lots as returned by ``_get_pos_lots``
+        """
+        return {
+            'cursor': fields.Datetime.now(),
+            'lots': self._get_pos_lots(location_ids),
+        }
+
+    @api.model
+    def get_pos_lot_changes(self, location_ids, cursor):
+        """Lots available in some locations for the products whose quants or
+        done moves changed since ``cursor``. Products without lots anymore
+        are given with an empty list.
+        """
+        if isinstance(location_ids, int):
+            location_ids = [location_ids]
+        # Resolve the location trees once for both lookups
+        location_ids = self.env['stock.location'].search([
+            ('id', 'child_of', location_ids)]).ids
+        since = fields.Datetime.to_string(
+            fields.Datetime.from_string(cursor) -
+            timedelta(seconds=LOT_CACHE_OVERLAP))
+        res = {'cursor': fields.Datetime.now()}
+        product_ids = set(data['product_id'][0] for data in self.read_group([
+            ('location_id', 'in', location_ids),
+            ('lot_id', '!=', False),
+            ('write_date', '>=', since),
+        ], ['product_id'], ['product_id']))
+        # Quants can be deleted, done moves give their products anyway
+        product_ids.update(
+            data['product_id'][0]
+            for data in self.env['stock.move.line'].read_group([
+                '|',
+                ('location_id', 'in', location_ids),
+                ('location_dest_id', 'in', location_ids),
+                ('lot_id', '!=', False),
+                ('state', '=', 'done'),
+                ('write_date', '>=', since),
+            ], ['product_id'], ['product_id']))
+        lots = self._get_pos_lots(location_ids, list(product_ids))
+        res['lots'] = dict(
+            (product_id, lots.get(product_id, []))
+            for product_id in product_ids)
+        return res
@@ -5,6 +5,13 @@ odoo.define("pos_lot_selection.chrome", function (require) {
     "use strict";
 
     var chrome = require("point_of_sale.chrome");
+    var core = require("web.core");
+
+    var QWeb = core.qweb;
+    var _t = core._t;
+
+    // Lots rendered at once in the select, the others are reached by typing
+    var LOTS_PAGE_SIZE = 50;
 
     chrome.Chrome.include({
         build_widgets: function () {
@@ -13,25 +20,125 @@ odoo.define("pos_lot_selection.chrome", function (require) {
             // Add events over instanced popup
             var events = {
                 "change .packlot-line-select": "lot_to_input",
+                "input .packlot-select-search": "filter_lots",
+                "keydown .packlot-select-search": "search_keydown",
+                "keydown .packlot-bulk-input": "bulk_keydown",
+                "click .packlot-bulk-add": "add_bulk_lots",
             };
             packlotline.events = Object.assign(
                 packlotline.events, events
             );
             // Add methods over instanced popup
             // Write the value in the corresponding input
-            packlotline.lot_to_input = function (event) {
-                var $select = $(event.target);
-                var $option = this.$("select.packlot-line-select option");
-                var $input = this.$el.find("input");
+            packlotline.set_lot_input = function (lot_name) {
+                var $input = this.$el.find("input.packlot-line-input");
                 if ($input.length) {
-                    $input[0].value = $select[0].value;
+                    $input[0].value = lot_name;
                     $input.blur();
                     $input.focus();
                 }
+            };
+            packlotline.lot_to_input = function (event) {
+                var $select = $(event.target);
+                var $option = this.$("select.packlot-line-select option");
+                this.set_lot_input($select[0].value);
                 $option.prop('selected', function () {
                     return this.defaultSelected;
                 });
             };
+            // Render the first page of the lots matching the search term
+            packlotline.render_lot_options = function (term) {
+                var pack_lot_lines = this.options.pack_lot_lines;
+                var lots = pack_lot_lines && pack_lot_lines.lots || [];
+                if (term) {
+                    term = term.toLowerCase();
+                    lots = _.filter(lots, function (lot) {
+                        return lot.name.toLowerCase().indexOf(term) !== -1;
+                    });
+                }
+                this.filtered_lots = lots;
+                this.$("select.packlot-line-select").html(QWeb.render(
+                    "PackLotLineSelectOptions", {
+                        lots: lots.slice(0, LOTS_PAGE_SIZE),
+                        more: Math.max(lots.length - LOTS_PAGE_SIZE, 0),
+                    }));
+            };
+            packlotline.filter_lots = function (event) {
+                this.render_lot_options($(event.target).val());
+            };
+            // Enter picks the first matching lot, and must not reach the
+            // popup handler adding a new lot line
+            packlotline.search_keydown = function (event) {
+                if (event.keyCode === $.ui.keyCode.ENTER) {
+                    event.stopPropagation();
+                    if (this.filtered_lots && this.filtered_lots.length) {
+                        this.set_lot_input(this.filtered_lots[0].name);
+                    }
+                }
+            };
+            // Scanners end each serial with Enter, which must stay in the
+            // text area instead of adding a new lot line
+            packlotline.bulk_keydown = function (event) {
+                if (event.keyCode === $.ui.keyCode.ENTER) {
+                    event.stopPropagation();
+                }
+            };
+            // Check all the scanned or pasted serials with a single lookup
+            // and set the available ones on the order line at once
+            packlotline.add_bulk_lots = function () {
+                var self = this;
+                var pack_lot_lines = this.options.pack_lot_lines;
+                var order_line = this.options.order_line;
+                // Keep what was typed in the lot inputs
+                this.$(".packlot-line-input").each(function (index, el) {
+                    var pack_lot_line = pack_lot_lines.get({
+                        cid: $(el).attr("cid"),
+                    });
+                    if (pack_lot_line) {
+                        pack_lot_line.set_lot_name($(el).val());
+                    }
+                });
+                var used_names = _.map(
+                    pack_lot_lines.get_valid_lots(), function (lot) {
+                        return lot.get("lot_name");
+                    });
+                var lot_names = _.difference(_.uniq(_.compact(
+                    this.$(".packlot-bulk-input").val().split(/[\s,;]+/)
+                )), used_names);
+                if (!lot_names.length) {
+                    return;
+                }
+                this.pos.check_lot_names(
+                    order_line.product.id, lot_names,
+                    this.pos.get_lot_location_ids()
+                ).then(function (lots) {
+                    var available = _.pluck(_.filter(lots, function (lot) {
+                        return lot.qty >= 1;
+                    }), "name");
+                    var rejected = _.difference(lot_names, available);
+                    order_line.add_lot_names(
+                        _.intersection(lot_names, available));
+                    self.renderElement();
+                    if (rejected.length) {
+                        self.$(".packlot-bulk-input").val(
+                            rejected.join("\n"));
+                        self.$(".packlot-bulk-error").text(_.str.sprintf(
+                            _t("Not available: %s"), rejected.join(", ")));
+                    }
+                }, function (error, event) {
+                    if (event) {
+                        event.preventDefault();
+                    }
+                    self.$(".packlot-bulk-error").text(_t(
+                        "The serial numbers could not be checked, " +
+                        "please try again."));
+                });
+            };
+            var renderElement = packlotline.renderElement;
+            packlotline.renderElement = function () {
+                renderElement.apply(this, arguments);
+                this.render_lot_options();
+            };
             this.gui.popup_instances.packlotline = packlotline;
             return res;
         },
@@ -5,51 +5,208 @@ odoo.define("pos_lot_selection.models", function (require) {
     "use strict";
 
     var models = require("point_of_sale.models");
-    var session = require("web.session");
+    var rpc = require("web.rpc");
 
+    // Delay between two refreshes of the lot cache, in milliseconds
+    var LOT_CACHE_REFRESH_DELAY = 60000;
+
+    models.load_models([{
+        label: "lots",
+        condition: function (self) {
+            return self.config.lot_cache;
+        },
+        loaded: function (self) {
+            return rpc.query({
+                model: "stock.quant",
+                method: "get_pos_lot_cache",
+                args: [self.get_lot_location_ids()],
+            }).then(function (result) {
+                self.lot_cache = result.lots;
+                self.lot_cache_cursor = result.cursor;
+                setInterval(function () {
+                    self.refresh_lot_cache();
+                }, LOT_CACHE_REFRESH_DELAY);
+            });
+        },
+    }]);
+
+    var _posmodel_super = models.PosModel.prototype;
     models.PosModel = models.PosModel.extend({
-        get_lot: function (product, location_id) {
-            var done = new $.Deferred();
-            session.rpc("/web/dataset/search_read", {
-                "model": "stock.quant",
-                "domain": [
-                    ["location_id", "=", location_id],
-                    ["product_id", "=", product],
-                    ["lot_id", "!=", false]]
-            }, {'async': false}).then(function (result) {
-                var product_lot = {};
-                if (result.length) {
-                    for (var i = 0; i < result.length; i++) {
-                        if (product_lot[result.records[i].lot_id[1]]) {
-                            product_lot[result.records[i].lot_id[1]] += result.records[i].quantity;
-                        } else {
-                            product_lot[result.records[i].lot_id[1]] = result.records[i].quantity;
-                        }
-                    }
+        // The lots are proposed from the PoS stock location, the additional
+        // lot locations and their children
+        get_lot_location_ids: function () {
+            return _.union(
+                [this.config.stock_location_id[0]],
+                this.config.lot_location_ids || []);
+        },
+        get_lot: function (product, location_ids) {
+            if (this.lot_cache) {
+                return $.when(this.lot_cache[product] || []);
+            }
+            return rpc.query({
+                model: "stock.quant",
+                method: "get_pos_lot_availability",
+                args: [product, location_ids],
+            }, {
+                timeout: 7500,
+                shadow: true,
+            });
+        },
+        // Available lots of a product among lot_names, checked at once
+        check_lot_names: function (product, lot_names, location_ids) {
+            if (this.lot_cache) {
+                return $.when(_.filter(
+                    this.lot_cache[product] || [], function (lot) {
+                        return _.contains(lot_names, lot.name);
+                    }));
+            }
+            return rpc.query({
+                model: "stock.quant",
+                method: "get_pos_lot_names_availability",
+                args: [product, lot_names, location_ids],
+            }, {
+                timeout: 7500,
+                shadow: true,
+            });
+        },
+        refresh_lot_cache: function () {
+            var self = this;
+            return rpc.query({
+                model: "stock.quant",
+                method: "get_pos_lot_changes",
+                args: [this.get_lot_location_ids(), this.lot_cache_cursor],
+            }, {
+                timeout: 7500,
+                shadow: true,
+            }).then(function (result) {
+                _.extend(self.lot_cache, result.lots);
+                self.lot_cache_cursor = result.cursor;
+            });
+        },
+        // Take the lots sold by an order out of the cache, without waiting
+        // for the next refresh
+        consume_lot_cache: function (order) {
+            var lot_cache = this.lot_cache;
+            if (!lot_cache || !order) {
+                return;
+            }
+            order.get_orderlines().forEach(function (line) {
+                var product_lots = lot_cache[line.product.id];
+                if (!product_lots) {
+                    return;
                 }
-                done.resolve(product_lot);
+                var lots = _.indexBy(product_lots, "name");
+                var qty = line.product.tracking === "serial" ? 1 : line.quantity;
+                line.pack_lot_lines.get_valid_lots().forEach(function (lot) {
+                    var cached_lot = lots[lot.get("lot_name")];
+                    if (cached_lot) {
+                        cached_lot.qty -= qty;
+                    }
+                });
+                lot_cache[line.product.id] = _.filter(
+                    product_lots, function (cached_lot) {
+                        return cached_lot.qty > 0;
+                    });
             });
-            return done;
+        },
+        push_order: function (order) {
+            this.consume_lot_cache(order);
+            return _posmodel_super.push_order.apply(this, arguments);
+        },
+        push_and_invoice_order: function (order) {
+            this.consume_lot_cache(order);
+            return _posmodel_super.push_and_invoice_order.apply(
+                this, arguments);
         },
     });
 
-    var _orderline_super = models.Orderline.prototype;
+    // Functions giving the key to sort the lots on, by lot_sort_order
+    var LOT_SORT_KEYS = {
+        name: function (lot) {
+            return lot.name;
+        },
+        qty: function (lot) {
+            return -lot.qty;
+        },
+        fefo: function (lot) {
+            return lot.removal_date || "9999";
+        },
+        expiry: function (lot) {
+            return lot.life_date || "9999";
+        },
+    };
+
     models.Orderline = models.Orderline.extend({
-        compute_lot_lines: function(){
-            var done = new $.Deferred();
-            var compute_lot_lines = _orderline_super.compute_lot_lines.apply(this, arguments);
-            this.pos.get_lot(this.product.id, this.pos.config.stock_location_id[0])
-                .then(function (product_lot) {
-                    var lot_name = Object.keys(product_lot);
-                    for (var i = 0; i < lot_name.length; i++) {
-                        if (product_lot[lot_name[i]] < compute_lot_lines.order_line.quantity) {
-                            lot_name.splice(i, 1);
-                        }
-                    }
-                    compute_lot_lines.lot_name = lot_name;
-                    done.resolve(compute_lot_lines);
-                });
-            return compute_lot_lines;
+        /**
+         * Fetch the lots that can cover this line and store them, sorted,
+         * on its pack lot lines.
+         *
+         * @returns {Deferred} resolved with the pack lot lines
+         */
+        compute_lot_names: function () {
+            var self = this;
+            return this.pos.get_lot(
+                this.product.id, this.pos.get_lot_location_ids()
+            ).then(function (product_lots) {
+                var pack_lot_lines = self.compute_lot_lines();
+                var serial = self.product.tracking === "serial";
+                var needed_qty = serial ? 1 : self.quantity;
+                var used_lots = {};
+                if (serial) {
+                    pack_lot_lines.get_valid_lots().forEach(function (lot) {
+                        used_lots[lot.get("lot_name")] = true;
+                    });
+                }
+                var sort_key = LOT_SORT_KEYS[self.pos.config.lot_sort_order] ||
+                    LOT_SORT_KEYS.name;
+                var lots = _.sortBy(_.filter(product_lots, function (lot) {
+                    return lot.qty >= needed_qty && !used_lots[lot.name];
+                }), sort_key);
+                pack_lot_lines.lots = lots;
+                pack_lot_lines.lot_name = _.pluck(lots, "name");
+                return pack_lot_lines;
+            });
+        },
+        /**
+         * Set several lot names on the pack lot lines in a single step,
+         * filling the empty lines before adding new ones.
+         *
+         * @param {String[]} lot_names
+         */
+        add_lot_names: function (lot_names) {
+            var self = this;
+            var pack_lot_lines = this.pack_lot_lines;
+            var empty_lines = pack_lot_lines.filter(function (pack_lot_line) {
+                return !pack_lot_line.get("lot_name");
+            });
+            var new_lines = [];
+            lot_names.forEach(function (lot_name) {
+                var pack_lot_line = empty_lines.shift();
+                if (!pack_lot_line) {
+                    pack_lot_line = new models.Packlotline(
+                        {}, {order_line: self});
+                    new_lines.push(pack_lot_line);
+                }
+                pack_lot_line.set_lot_name(lot_name);
+            });
+            pack_lot_lines.add(new_lines);
+            pack_lot_lines.set_quantity_by_lot();
+        },
+    });
+
+    var _order_super = models.Order.prototype;
+    models.Order = models.Order.extend({
+        // Wait for the available lots before showing the popup
+        display_lot_popup: function () {
+            var self = this;
+            var args = arguments;
+            var order_line = this.get_selected_orderline();
+            if (!order_line) {
+                return _order_super.display_lot_popup.apply(this, args);
+            }
+            order_line.compute_lot_names().always(function () {
+                _order_super.display_lot_popup.apply(self, args);
+            });
         },
     });
 
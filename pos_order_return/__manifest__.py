@@ -5,7 +5,7 @@
 
 {
     'name': 'Point of Sale Order Return',
-    'version': '11.0.1.0.0',
+    'version': '11.0.1.2.0',
     'category': 'Point Of Sale',
     'author': 'La Louve, '
               'GRAP, '
@@ -18,10 +18,20 @@
         'point_of_sale',
     ],
     'data': [
+        'security/ir.model.access.csv',
+        'data/ir_config_parameter.xml',
+        'data/ir_cron.xml',
+        'templates/assets.xml',
         'wizard/pos_partial_return_wizard_view.xml',
+        'views/pos_config_view.xml',
         'views/pos_order_view.xml',
+        'views/pos_order_return_job_view.xml',
+        'views/pos_order_return_report_view.xml',
         'views/product_product_view.xml',
     ],
+    'qweb': [
+        'static/src/xml/pos.xml',
+    ],
     'demo': [
         'demo/product_product.xml',
     ],
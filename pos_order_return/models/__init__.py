@@ -1,3 +1,9 @@
 
 from . import product_template
+from . import pos_config
 from . import pos_order
+from . import pos_order_refund_import
+from . import pos_order_return_job
+from . import pos_order_return_report
+from . import pos_session
+from . import stock_move
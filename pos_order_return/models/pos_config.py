@@ -0,0 +1,29 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import fields, models
+
+
+class PosConfig(models.Model):
+    _inherit = 'pos.config'
+
+    return_deferred_processing = fields.Boolean(
+        string='Deferred Return Processing',
+        help="Refund invoices and return pickings are not made when the "
+             "refund order is paid, but queued and processed later by a "
+             "scheduled action, or at the latest when the session is "
+             "closed.",
+    )
+    group_return_pickings = fields.Boolean(
+        string='Group Return Pickings',
+        help="Instead of one return picking per refund order, the stock "
+             "returns of all the refund orders of a session are made when "
+             "it is closed, with one return picking per returned location.",
+    )
+    group_refund_invoices = fields.Boolean(
+        string='Group Refund Invoices',
+        help="Instead of one refund invoice made when each refund order is "
+             "paid, the refund invoices of a session are made when it is "
+             "closed, with one refund invoice per partner and returned "
+             "invoice, all posted at once.",
+    )
@@ -3,18 +3,26 @@
 # Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
 
+from collections import OrderedDict, defaultdict
 
 from odoo import _, api, fields, models
-from odoo.exceptions import ValidationError
+from odoo.addons import decimal_precision as dp
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import float_round
+from odoo.tools.sql import column_exists, create_column
 
 
 class PosOrder(models.Model):
     _inherit = 'pos.order'
 
+    pos_reference = fields.Char(
+        index=True,
+    )
     returned_order_id = fields.Many2one(
         comodel_name='pos.order',
         string='Returned Order',
         readonly=True,
+        index=True,
     )
     refund_order_ids = fields.One2many(
         comodel_name='pos.order',
@@ -25,11 +33,34 @@ class PosOrder(models.Model):
     refund_order_qty = fields.Integer(
         compute='_compute_refund_order_qty',
         string='Refund Orders Quantity',
+        store=True,
     )
 
+    @api.model_cr_context
+    def _auto_init(self):
+        """Fill the refund summary in SQL when the column is created, rather
+        than computing it with the ORM for all the existing orders"""
+        cr = self.env.cr
+        if not column_exists(cr, 'pos_order', 'refund_order_qty'):
+            create_column(cr, 'pos_order', 'refund_order_qty', 'int4')
+            cr.execute("UPDATE pos_order SET refund_order_qty = 0")
+            if column_exists(cr, 'pos_order', 'returned_order_id'):
+                cr.execute("""
+                    UPDATE pos_order o SET refund_order_qty = r.qty
+                    FROM (
+                        SELECT returned_order_id, COUNT(*) AS qty
+                        FROM pos_order
+                        WHERE returned_order_id IS NOT NULL
+                        GROUP BY returned_order_id
+                    ) r
+                    WHERE r.returned_order_id = o.id
+                """)
+        return super(PosOrder, self)._auto_init()
+
+    @api.depends('refund_order_ids')
     def _compute_refund_order_qty(self):
         order_data = self.env['pos.order'].read_group(
-            [('returned_order_id', 'in', self.ids)],
+            [('returned_order_id', 'in', self.filtered('id').ids)],
             ['returned_order_id'], ['returned_order_id']
         )
         mapped_data = dict(
@@ -38,13 +69,121 @@ class PosOrder(models.Model):
         for order in self:
             order.refund_order_qty = mapped_data.get(order.id, 0)
 
-    def _blank_refund(self, res):
+    @api.model
+    def _order_fields(self, ui_order):
+        res = super(PosOrder, self)._order_fields(ui_order)
+        res['returned_order_id'] = ui_order.get('returned_order_id', False)
+        return res
+
+    @api.model
+    def get_return_data_from_ui(self, references):
+        """Look up an order by its receipt reference and return, in one
+        call, all what the PoS needs to return it.
+
+        :param references: receipt reference, or list of candidate ones
+        :return: dict with the order and its lines that can still be
+            returned, or False if no returnable order is found
+        """
+        if not isinstance(references, list):
+            references = [references]
+        order = self.search([
+            ('pos_reference', 'in', references),
+            ('returned_order_id', '=', False),
+            ('state', '!=', 'draft'),
+        ], limit=1)
+        lines = [{
+            'id': line.id,
+            'product_id': line.product_id.id,
+            'product_name': line.product_id.display_name,
+            'price_unit': line.price_unit,
+            'discount': line.discount,
+            'qty': line.qty,
+            'returnable_qty': line.returnable_qty,
+        } for line in order.lines if line.returnable_qty > 0]
+        if not lines:
+            return False
+        return {
+            'id': order.id,
+            'name': order.name,
+            'pos_reference': order.pos_reference,
+            'date_order': order.date_order,
+            'partner_id': order.partner_id.id,
+            'lines': lines,
+        }
+
+    def _get_refund_session(self):
+        """Same session lookup as the core refund algorithm"""
+        session = self.env['pos.session'].search([
+            ('state', '!=', 'closed'),
+            ('user_id', '=', self.env.uid),
+        ], limit=1)
+        if not session:
+            raise UserError(_(
+                'To return product(s), you need to open a session that will '
+                'be used to register the refund.'))
+        return session
+
+    def _prepare_refund_values(self, session):
+        self.ensure_one()
+        return {
+            'name': self.name + _(' REFUND'),
+            'session_id': session.id,
+            'date_order': fields.Datetime.now(),
+            'pos_reference': self.pos_reference,
+            'returned_order_id': self.id,
+            'lines': False,
+        }
+
+    def _refund(self, return_qties):
+        """Create the refund orders of the recordset, with all their lines
+        built in memory, and check the returned quantities once for all of
+        them.
+
+        :param return_qties: dict {pos.order.line id: quantity to return},
+            lines without quantity are not returned.
+        :return: dict {original order: refund order}
+        """
+        session = self._get_refund_session()
+        refund_orders = self.browse()
+        res = {}
+        for order in self:
+            res[order] = order._create_refund(session, return_qties)
+            refund_orders |= res[order]
+        refund_orders.mapped('lines')._check_return_qty()
+        return res
+
+    def _create_refund(self, session, return_qties, values=None):
+        """Create the refund order of the current order with all its lines
+        in a single create, without checking the returned quantities: the
+        caller checks them once for all the refunds it makes.
+
+        :param return_qties: dict {pos.order.line id: quantity to return}
+        :param values: values overriding the prepared refund ones
+        :return: the refund order
+        """
         self.ensure_one()
-        new_order = self.browse(res['res_id'])
-        new_order.returned_order_id = self
-        # Remove created lines and recreate and link Lines
-        new_order.lines.unlink()
-        return new_order
+        ctx = dict(self.env.context, do_not_check_negative_qty=True)
+        lines = self.lines.filtered(lambda x: return_qties.get(x.id))
+        refund_values = self._prepare_refund_values(session)
+        refund_values.update(values or {})
+        vals = self.copy_data(refund_values)[0]
+        vals['lines'] = [
+            (0, 0, x._prepare_refund_line_values(return_qties[x.id]))
+            for x in lines]
+        return self.browse(self.with_context(ctx).create(vals).id)
+
+    def _get_refund_action(self, refund_order):
+        return {
+            'name': _('Return Products'),
+            'view_type': 'form',
+            'view_mode': 'form',
+            'res_model': 'pos.order',
+            'res_id': refund_order.id,
+            'view_id': False,
+            'context': self.env.context,
+            'type': 'ir.actions.act_window',
+            'target': 'current',
+        }
 
     def _prepare_invoice(self):
         res = super(PosOrder, self)._prepare_invoice()
@@ -64,71 +203,285 @@ class PosOrder(models.Model):
         self.account_move = self.invoice_id.move_id
 
     def refund(self):
-        # Call super to use original refund algorithm (session management, ...)
-        ctx = dict(self.env.context, do_not_check_negative_qty=True)
-        res = super(PosOrder, self.with_context(ctx)).refund()
-        new_order = self._blank_refund(res)
-        for line in self.lines:
-            qty = - line.max_returnable_qty([])
-            if qty != 0:
-                copy_line = line.copy()
-                copy_line.write({
-                    'order_id': new_order.id,
-                    'returned_line_id': line.id,
-                    'qty': qty,
-                })
-        return res
+        return_qties = dict(
+            (line.id, line.returnable_qty) for line in self.mapped('lines'))
+        res = self._refund(return_qties)
+        return self._get_refund_action(res[self[0]])
 
     def partial_refund(self, partial_return_wizard):
         ctx = dict(self.env.context, partial_refund=True)
-        res = self.with_context(ctx).refund()
-        new_order = self._blank_refund(res)
-        for wizard_line in partial_return_wizard.line_ids:
-            qty = -wizard_line.qty
-            if qty != 0:
-                copy_line = wizard_line.pos_order_line_id.copy()
-                copy_line.write({
-                    'order_id': new_order.id,
-                    'returned_line_id': wizard_line.pos_order_line_id.id,
-                    'qty': qty,
-                })
-        return res
+        return_qties = dict(
+            (wizard_line.pos_order_line_id.id, wizard_line.qty)
+            for wizard_line in partial_return_wizard.line_ids.filtered('qty'))
+        res = self.with_context(ctx)._refund(return_qties)
+        return self._get_refund_action(res[self[0]])
+
+    @api.multi
+    def refund_batch(self):
+        """Refund at once every order of the recordset that still has
+        something to return. Draft orders and refund orders are ignored.
+
+        :return: dict {original order id: refund order id}, with ids as
+            strings so that the result can be sent over XML-RPC.
+        """
+        orders = self.filtered(
+            lambda x: x.state != 'draft' and not x.returned_order_id)
+        # Prefetch the data read while preparing the refunds
+        lines = orders.mapped('lines')
+        lines.mapped('product_id')
+        return_qties = dict(
+            (line.id, line.returnable_qty) for line in lines
+            if line.returnable_qty > 0)
+        orders = lines.filtered(
+            lambda x: x.id in return_qties).mapped('order_id')
+        res = orders._refund(return_qties)
+        return dict(
+            (str(order.id), refund_order.id)
+            for order, refund_order in res.items())
+
+    def _is_return_deferred(self):
+        self.ensure_one()
+        return self.session_id.config_id.return_deferred_processing
+
+    def _create_grouped_refund_invoices(self):
+        """Create the refund invoices of all the refund orders of the
+        recordset, with one refund invoice per partner and returned invoice,
+        and post them all at once.
+
+        :return: the refund invoices
+        """
+        groups = OrderedDict()
+        for order in self.sorted('id'):
+            key = (order.partner_id.id, order.returned_order_id.invoice_id.id)
+            groups.setdefault(key, self.browse())
+            groups[key] |= order
+        invoice_obj = self.env['account.invoice']
+        invoices = invoice_obj
+        for key, orders in groups.items():
+            order = orders[0]
+            if not order.partner_id:
+                raise UserError(_('Please provide a partner for the sale.'))
+            ctx = dict(
+                self.env.context, force_company=order.company_id.id,
+                company_id=order.company_id.id)
+            values = order._prepare_invoice()
+            values['origin'] = ', '.join(orders.mapped('name'))
+            invoice = invoice_obj.new(values)
+            invoice._onchange_partner_id()
+            invoice.fiscal_position_id = order.fiscal_position_id
+            invoice = invoice_obj.with_context(ctx).sudo().create(
+                invoice._convert_to_write(
+                    {name: invoice[name] for name in invoice._cache}))
+            invoice.message_post(body=_(
+                "This refund invoice has been created from the point of sale "
+                "orders: %s") % ', '.join(orders.mapped('name')))
+            for refund_order in orders:
+                for line in refund_order.lines:
+                    refund_order.with_context(
+                        ctx)._action_create_invoice_line(line, invoice.id)
+            invoice.with_context(ctx).sudo().compute_taxes()
+            orders.write({'invoice_id': invoice.id, 'state': 'invoiced'})
+            groups[key] = (orders, invoice)
+            invoices |= invoice
+        invoices.sudo().action_invoice_open()
+        for orders, invoice in groups.values():
+            orders.write({'account_move': invoice.move_id.id})
+        return invoices
 
     def action_pos_order_paid(self):
-        if self.returned_order_id and self.returned_order_id.invoice_id:
-            self._action_pos_order_invoice()
+        # Grouped refund invoices are made when the session is closed
+        if (self.returned_order_id and self.returned_order_id.invoice_id and
+                not self.session_id.config_id.group_refund_invoices):
+            if self._is_return_deferred():
+                self.env['pos.order.return.job']._enqueue(self, 'invoice')
+            else:
+                self._action_pos_order_invoice()
         return super(PosOrder, self).action_pos_order_paid()
 
-    def _create_picking_return(self):
+    @api.model
+    def _get_picking_return_location(self, picking):
+        """Destination of the returns, as stock.return.picking defaults it"""
+        return_type = picking.picking_type_id.return_picking_type_id
+        if return_type.default_location_dest_id.return_location:
+            return return_type.default_location_dest_id
+        return picking.location_id
+
+    def _prepare_picking_return_moves(self, move_returnable_qty=None):
+        """Split the refunded quantities of each line over the moves of the
+        returned order picking. Refund lines and moves are both read once.
+
+        :param move_returnable_qty: dict {move id: quantity not returned yet}
+            shared between several calls when returns are grouped, updated
+            in place.
+        :return: list of (original move, quantity to return, refund line)
+        """
+        self.ensure_one()
+        if move_returnable_qty is None:
+            move_returnable_qty = {}
+        product_ids = set(self.mapped('lines.product_id').ids)
+        product_moves = defaultdict(list)
+        for move in self.returned_order_id.picking_id.move_lines:
+            if (move.scrapped or move.state == 'cancel' or
+                    move.product_id.id not in product_ids):
+                continue
+            product_moves[move.product_id.id].append(move)
+            if move.id not in move_returnable_qty:
+                # Quantity not already returned, as in stock.return.picking
+                move_returnable_qty[move.id] = move.product_qty - sum(
+                    move.move_dest_ids.filtered(
+                        lambda x: x.state in (
+                            'partially_available', 'assigned', 'done')
+                    ).mapped('move_line_ids.product_qty'))
+        res = []
+        for line in self.lines:
+            to_return = -line.qty
+            for move in product_moves[line.product_id.id]:
+                quantity = float_round(
+                    min(to_return, move_returnable_qty[move.id]),
+                    precision_rounding=move.product_uom.rounding)
+                if quantity <= 0:
+                    continue
+                move_returnable_qty[move.id] -= quantity
+                to_return -= quantity
+                res.append((move, quantity, line))
+        return res
+
+    @api.model
+    def _prepare_return_move_values(self, move, quantity, line, picking_type,
+                                    location):
+        vals = move.copy_data({
+            'product_id': move.product_id.id,
+            'product_uom_qty': quantity,
+            'product_uom': move.product_id.uom_id.id,
+            'state': 'draft',
+            'location_id': move.location_dest_id.id,
+            'location_dest_id': location.id or move.location_id.id,
+            'picking_type_id': picking_type.id,
+            'warehouse_id': move.picking_id.picking_type_id.warehouse_id.id,
+            'origin_returned_move_id': move.id,
+            'procure_method': 'make_to_stock',
+            'pos_refund_line_id': line.id,
+        })[0]
+        vals.pop('picking_id', None)
+        vals.update({
+            'move_orig_ids': [
+                (4, x.id) for x in
+                move.move_dest_ids.mapped('returned_move_ids') | move],
+            'move_dest_ids': [
+                (4, x.id) for x in
+                move.move_orig_ids.mapped('returned_move_ids')],
+        })
+        return vals
+
+    @api.model
+    def _create_return_picking(self, picking, move_qties, origin=None):
+        """Create and reserve the return of ``picking`` as stock.return.picking
+        would do it, but with the picking and all its moves created at once.
+
+        :param move_qties: list of (original move, quantity to return,
+            refund line)
+        :param origin: origin of the return picking, defaults to the name of
+            the returned picking
+        """
+        if picking.state != 'done':
+            raise UserError(_("You may only return Done pickings"))
+        if not move_qties:
+            raise UserError(_(
+                "Please specify at least one non-zero quantity."))
+        picking_type = (picking.picking_type_id.return_picking_type_id or
+                        picking.picking_type_id)
+        location = self._get_picking_return_location(picking)
+        moves = self.env['stock.move'].union(*[x[0] for x in move_qties])
+        moves.mapped('move_dest_ids').filtered(
+            lambda x: x.state not in ('done', 'cancel'))._do_unreserve()
+        return_picking = picking.copy({
+            'move_lines': [
+                (0, 0, self._prepare_return_move_values(
+                    move, quantity, line, picking_type, location))
+                for move, quantity, line in move_qties],
+            'picking_type_id': picking_type.id,
+            'state': 'draft',
+            'origin': origin or _("Return of %s") % picking.name,
+            'location_id': picking.location_dest_id.id,
+            'location_dest_id': location.id,
+        })
+        return_picking.message_post_with_view(
+            'mail.message_origin_link',
+            values={'self': return_picking, 'origin': picking},
+            subtype_id=self.env.ref('mail.mt_note').id)
+        return_picking.action_confirm()
+        return_picking.action_assign()
+        return return_picking
+
+    def _action_create_picking_return(self):
+        """Return the picking of the returned order, if there is something
+        delivered to return"""
         self.ensure_one()
         picking = self.returned_order_id.picking_id
-        ctx = dict(self.env.context,
-                   active_ids=picking.ids, active_id=picking.id)
-        wizard = self.env['stock.return.picking'].with_context(ctx).create({})
-        # Discard not returned lines
-        wizard.product_return_moves.filtered(
-            lambda x: x.product_id not in self.mapped(
-                'lines.product_id')).unlink()
-        to_return = {}
-        for product in self.lines.mapped('product_id'):
-            to_return[product] = -sum(
-                self.lines.filtered(
-                    lambda x: x.product_id == product).mapped('qty'))
-        for move in wizard.product_return_moves:
-            if to_return[move.product_id] < move.quantity:
-                move.quantity = to_return[move.product_id]
-            to_return[move.product_id] -= move.quantity
-        return wizard
+        move_qties = picking and self._prepare_picking_return_moves()
+        if not move_qties:
+            return self.env['stock.picking']
+        return_picking = self._create_return_picking(picking, move_qties)
+        self.write({'picking_id': return_picking.id})
+        return return_picking
+
+    def _create_grouped_picking_returns(self):
+        """Create the returns of all the refund orders of the recordset with
+        one return picking per location of the returned pickings.
+
+        The refund orders whose returned picking isn't done yet can't be
+        returned now: they get a deferred refund job, which fails and shows
+        the error until the picking is done.
+
+        :return: the return pickings
+        """
+        groups = OrderedDict()
+        move_returnable_qty = {}
+        not_done_orders = self.browse()
+        self.mapped('returned_order_id.picking_id.move_lines.product_id')
+        for order in self.sorted('id'):
+            picking = order.returned_order_id.picking_id
+            if picking and picking.state != 'done':
+                not_done_orders |= order
+                continue
+            move_qties = order._prepare_picking_return_moves(
+                move_returnable_qty)
+            if not move_qties:
+                continue
+            key = (picking.location_id.id, picking.picking_type_id.id)
+            group = groups.setdefault(key, [picking, self.browse(), []])
+            group[1] |= order
+            group[2] += move_qties
+        pickings = self.env['stock.picking']
+        for picking, orders, move_qties in groups.values():
+            return_picking = self._create_return_picking(
+                picking, move_qties, origin=', '.join(
+                    orders.mapped('session_id.name')))
+            orders.write({'picking_id': return_picking.id})
+            pickings |= return_picking
+        self.env['pos.order.return.job']._enqueue(not_done_orders, 'picking')
+        return pickings
 
     def create_picking(self):
         """Odoo bases return picking if the quantities are negative, but it's
         not linked to the original one"""
         res = super(PosOrder, self.filtered(lambda x: not x.returned_order_id)
                     ).create_picking()
-        for order in self.filtered('returned_order_id'):
-            wizard = order._create_picking_return()
-            res = wizard.create_returns()
-            order.write({'picking_id': res['res_id']})
+        # Grouped returns are made when the session is closed
+        refund_orders = self.filtered(
+            lambda x: x.returned_order_id and
+            not x.session_id.config_id.group_return_pickings)
+        deferred_orders = refund_orders.filtered(
+            lambda x: x._is_return_deferred())
+        # Nothing to return when nothing was delivered
+        self.env['pos.order.return.job']._enqueue(
+            deferred_orders.filtered('returned_order_id.picking_id'),
+            'picking')
+        # Prefetch the returned moves of all the orders at once
+        (refund_orders - deferred_orders).mapped(
+            'returned_order_id.picking_id.move_lines.product_id')
+        for order in refund_orders - deferred_orders:
+            order._action_create_picking_return()
         return res
 
 
@@ -139,6 +492,7 @@ class PosOrderLine(models.Model):
         comodel_name='pos.order.line',
         string='Returned Order',
         readonly=True,
+        index=True,
     )
     refund_line_ids = fields.One2many(
         comodel_name='pos.order.line',
@@ -146,44 +500,154 @@ class PosOrderLine(models.Model):
         string='Refund Lines',
         readonly=True,
     )
+    refunded_qty = fields.Float(
+        compute='_compute_refund_qty',
+        string='Refunded Quantity',
+        digits=dp.get_precision('Product Unit of Measure'),
+        store=True,
+    )
+    returnable_qty = fields.Float(
+        compute='_compute_refund_qty',
+        string='Returnable Quantity',
+        digits=dp.get_precision('Product Unit of Measure'),
+        store=True,
+        help="Quantity of the line that can still be returned, depending of "
+             "the refunds already done.",
+    )
 
-    @api.model
+    @api.model_cr_context
+    def _auto_init(self):
+        """Fill the refund summary in SQL when the columns are created,
+        rather than computing it with the ORM for all the existing lines"""
+        cr = self.env.cr
+        if not column_exists(cr, 'pos_order_line', 'refunded_qty'):
+            create_column(cr, 'pos_order_line', 'refunded_qty', 'numeric')
+            create_column(cr, 'pos_order_line', 'returnable_qty', 'numeric')
+            cr.execute("UPDATE pos_order_line SET refunded_qty = 0")
+            if column_exists(cr, 'pos_order_line', 'returned_line_id'):
+                cr.execute("""
+                    UPDATE pos_order_line l SET refunded_qty = r.qty
+                    FROM (
+                        SELECT returned_line_id, -SUM(qty) AS qty
+                        FROM pos_order_line
+                        WHERE returned_line_id IS NOT NULL
+                        GROUP BY returned_line_id
+                    ) r
+                    WHERE r.returned_line_id = l.id
+                """)
+            cr.execute("""
+                UPDATE pos_order_line SET returnable_qty = qty - refunded_qty
+            """)
+        return super(PosOrderLine, self)._auto_init()
+
+    def _prepare_refund_line_values(self, qty):
+        """Values of a line returning ``qty`` of the current one, as the copy
+        of the line would have them"""
+        self.ensure_one()
+        vals = self.copy_data({
+            'returned_line_id': self.id,
+            'qty': -qty,
+        })[0]
+        vals.pop('order_id', None)
+        return vals
+
+    @api.depends('qty', 'refund_line_ids.qty')
+    def _compute_refund_qty(self):
+        lines = self.filtered('id')
+        refunded_qty = {}
+        if lines:
+            for data in self.read_group(
+                    [('returned_line_id', 'in', lines.ids)],
+                    ['returned_line_id', 'qty'], ['returned_line_id']):
+                refunded_qty[data['returned_line_id'][0]] = -data['qty']
+        for line in self:
+            line.refunded_qty = refunded_qty.get(line.id, 0.0)
+            line.returnable_qty = line.qty - line.refunded_qty
+
+    @api.multi
+    def _lock_returned_lines(self):
+        """Lock the rows of the returned lines until the end of the
+        transaction, before their returnable quantities are read.
+
+        Concurrent returns of the same lines are serialized: the second
+        transaction waits for the first one, then fails with a serialization
+        error as the returned lines were updated meanwhile, and is retried
+        by the server seeing the first return. Returns of other lines are
+        not blocked, and the rows are locked by id to avoid deadlocks.
+        """
+        if self.ids:
+            self.env.cr.execute("""
+                SELECT id FROM pos_order_line
+                WHERE id IN %s
+                ORDER BY id
+                FOR UPDATE
+            """, (tuple(self.ids),))
+
+    @api.multi
+    def _get_returnable_qty(self, ignored_line_ids=None):
+        """Returnable quantities of the recordset, read from the stored
+        refund summary.
+
+        :param ignored_line_ids: ids of refund lines that must not be taken
+            into account, typically the lines being checked.
+        :return: dict {line id: returnable quantity}
+        """
+        res = dict(
+            (line.id, line.returnable_qty) for line in self.filtered('id'))
+        if ignored_line_ids:
+            for line in self.browse(ignored_line_ids).filtered(
+                    lambda x: x.returned_line_id.id in res):
+                res[line.returned_line_id.id] -= line.qty
+        return res
+
+    @api.multi
     def max_returnable_qty(self, ignored_line_ids):
-        qty = self.qty
-        for refund_line in self.refund_line_ids:
-            if refund_line.id not in ignored_line_ids:
-                qty += refund_line.qty
-        return qty
+        self.ensure_one()
+        return self._get_returnable_qty(ignored_line_ids)[self.id]
 
     @api.constrains('returned_line_id', 'qty')
     def _check_return_qty(self):
         if self.env.context.get('do_not_check_negative_qty', False):
             return True
+        # Prefetch everything needed by the checks for the whole recordset
+        self.mapped('product_id.uom_id.name')
+        self.mapped('product_id.product_tmpl_id.pos_allow_negative_qty')
+        returned_lines = self.mapped('returned_line_id')
+        returned_lines._lock_returned_lines()
+        returnable_qty = returned_lines._get_returnable_qty(self.ids)
+        # Quantities returned by the checked lines themselves, as each line
+        # must take into account the other ones returning the same line
+        checked_qty = defaultdict(float)
+        for line in self.filtered('returned_line_id'):
+            checked_qty[line.returned_line_id.id] += line.qty
+        errors = []
         for line in self:
-            if line.returned_line_id and -line.qty > line.returned_line_id.qty:
-                raise ValidationError(_(
+            returned_line = line.returned_line_id
+            uom_name = line.product_id.uom_id.name
+            if returned_line and -line.qty > returned_line.qty:
+                errors.append(_(
                     "You can not return %d %s of %s because the original "
                     "Order line only mentions %d %s."
-                ) % (-line.qty, line.product_id.uom_id.name,
-                     line.product_id.name, line.returned_line_id.qty,
-                     line.product_id.uom_id.name))
-            if (line.returned_line_id and
-                    -line.qty >
-                    line.returned_line_id.max_returnable_qty([line.id])):
-                raise ValidationError(_(
-                    "You can not return %d %s of %s because some refunds"
-                    " have already been done.\n Maximum quantity allowed :"
-                    " %d %s."
-                ) % (-line.qty, line.product_id.uom_id.name,
-                     line.product_id.name,
-                     line.returned_line_id.max_returnable_qty([line.id]),
-                     line.product_id.uom_id.name))
-            if (not line.returned_line_id and
-                    line.qty < 0 and not
+                ) % (-line.qty, uom_name, line.product_id.name,
+                     returned_line.qty, uom_name))
+                continue
+            if returned_line:
+                max_returnable_qty = (
+                    returnable_qty[returned_line.id] +
+                    checked_qty[returned_line.id] - line.qty)
+                if -line.qty > max_returnable_qty:
+                    errors.append(_(
+                        "You can not return %d %s of %s because some refunds"
+                        " have already been done.\n Maximum quantity allowed :"
+                        " %d %s."
+                    ) % (-line.qty, uom_name, line.product_id.name,
+                         max_returnable_qty, uom_name))
+            elif (line.qty < 0 and not
                     line.product_id.product_tmpl_id.pos_allow_negative_qty):
-                raise ValidationError(_(
+                errors.append(_(
                     "For legal and traceability reasons, you can not set a"
                     " negative quantity (%d %s of %s), without using "
                     "return wizard."
-                ) % (line.qty, line.product_id.uom_id.name,
-                     line.product_id.name))
+                ) % (line.qty, uom_name, line.product_id.name))
+        if errors:
+            raise ValidationError('\n'.join(errors))
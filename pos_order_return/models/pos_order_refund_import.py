@@ -0,0 +1,292 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import csv
+import json
+import logging
+from collections import OrderedDict, defaultdict
+
+from odoo import _, api, fields, models, tools
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+
+_logger = logging.getLogger(__name__)
+
+
+class PosOrderRefundImport(models.AbstractModel):
+    """Import of historical refunds, e.g. when stores are migrated.
+
+    Each row of the file returns a quantity of a product of an original
+    order, with the columns:
+
+    * ``order_reference``: receipt reference or name of the original order
+    * ``product``: internal reference or barcode of the returned product
+    * ``qty``: quantity returned, spread over the lines of the product
+    * ``refund_reference`` (optional): name of the refund order, rows with
+      the same one are returned in the same refund order
+    * ``date`` (optional): date of the refund order
+
+    The file is read and processed by chunks, so that the memory used
+    doesn't depend on the size of the file. The rows of a refund order
+    must be consecutive to end up in the same refund order.
+    """
+    _name = 'pos.order.refund.import'
+    _description = 'PoS Historical Refunds Import'
+
+    @api.model
+    def _read_rows(self, stream, file_format):
+        """Rows of the file, read one at a time. JSON lines are decoded
+        when the row is parsed, so that an invalid line is a row error.
+
+        :param file_format: 'csv' or 'jsonl'
+        :return: iterator of (row number, row)
+        """
+        if file_format == 'csv':
+            rows = csv.DictReader(stream)
+        elif file_format == 'jsonl':
+            rows = (line for line in stream if line.strip())
+        else:
+            raise UserError(_(
+                "Unknown refund file format %s, it should be csv or "
+                "jsonl.") % file_format)
+        return enumerate(rows, 1)
+
+    @api.model
+    def _parse_row(self, row):
+        """Values of a row of the file
+
+        :raise ValueError: if the row is invalid
+        """
+        if not isinstance(row, dict):
+            row = json.loads(row)
+            if not isinstance(row, dict):
+                raise ValueError(_('A row should be a JSON object.'))
+        values = {}
+        for name in ('order_reference', 'product'):
+            values[name] = tools.ustr(row.get(name) or '').strip()
+            if not values[name]:
+                raise ValueError(_('The column %s is required.') % name)
+        values['qty'] = float(row.get('qty') or 0.0)
+        if values['qty'] <= 0:
+            raise ValueError(_('The quantity to return must be positive.'))
+        values['refund_reference'] = tools.ustr(
+            row.get('refund_reference') or '').strip()
+        date = tools.ustr(row.get('date') or '').strip()
+        values['date'] = date and fields.Datetime.to_string(
+            fields.Datetime.from_string(date))
+        return values
+
+    @api.model
+    def _get_refund_key(self, values):
+        """Rows with the same key are returned in the same refund order"""
+        return (
+            values['order_reference'], values['refund_reference'],
+            values['date'])
+
+    @api.model
+    def _read_chunks(self, stream, file_format, chunk_size, errors):
+        """Parsed rows of the file, by chunks of about ``chunk_size`` rows.
+        The rows of a refund order are never split between two chunks.
+
+        :param errors: list the invalid rows are appended to
+        :return: iterator of lists of (row number, values)
+        """
+        chunk = []
+        key = None
+        for number, row in self._read_rows(stream, file_format):
+            try:
+                values = self._parse_row(row)
+            except ValueError as e:
+                errors.append((number, tools.ustr(e)))
+                continue
+            row_key = self._get_refund_key(values)
+            if len(chunk) >= chunk_size and row_key != key:
+                yield chunk
+                chunk = []
+            chunk.append((number, values))
+            key = row_key
+        if chunk:
+            yield chunk
+
+    @api.model
+    def _get_orders(self, references):
+        """Original orders, in a single search, by receipt reference or by
+        name, the receipt reference being preferred
+
+        :return: dict {reference: pos.order}
+        """
+        orders = self.env['pos.order'].search([
+            ('returned_order_id', '=', False),
+            ('state', '!=', 'draft'),
+            '|',
+            ('pos_reference', 'in', references),
+            ('name', 'in', references),
+        ], order='id')
+        res = {}
+        for field_name in ('pos_reference', 'name'):
+            for order in orders:
+                res.setdefault(order[field_name], order)
+        return res
+
+    @api.model
+    def _get_products(self, codes):
+        """Products, in a single search, by internal reference or by
+        barcode, the internal reference being preferred
+
+        :return: dict {code: product.product}
+        """
+        products = self.env['product.product'].with_context(
+            active_test=False).search([
+                '|',
+                ('default_code', 'in', codes),
+                ('barcode', 'in', codes),
+            ], order='id')
+        res = {}
+        for field_name in ('default_code', 'barcode'):
+            for product in products:
+                res.setdefault(product[field_name], product)
+        return res
+
+    @api.model
+    def _prepare_refunds(self, rows, errors):
+        """Spread the returned quantities of the rows over the lines of the
+        original orders, against their returnable quantities, with the
+        orders, products and lines of all the rows read at once.
+
+        :param rows: list of (row number, values)
+        :param errors: list the rows that can't be returned are appended to
+        :return: OrderedDict {(original order, refund reference, date):
+            {'qties': {line id: quantity}, 'rows': [row numbers]}}
+        """
+        orders = self._get_orders(list(set(
+            values['order_reference'] for __, values in rows)))
+        products = self._get_products(list(set(
+            values['product'] for __, values in rows)))
+        lines = self.env['pos.order'].browse(list(set(
+            order.id for order in orders.values()))).mapped('lines')
+        product_lines = defaultdict(list)
+        available = {}
+        for line in lines:
+            product_lines[(line.order_id.id, line.product_id.id)].append(line)
+            available[line.id] = line.returnable_qty
+        precision = self.env['decimal.precision'].precision_get(
+            'Product Unit of Measure')
+        res = OrderedDict()
+        for number, values in rows:
+            order = orders.get(values['order_reference'])
+            if not order:
+                errors.append((number, _(
+                    'No order to return with the reference %s.') %
+                    values['order_reference']))
+                continue
+            product = products.get(values['product'])
+            if not product:
+                errors.append((number, _(
+                    'No product with the reference or barcode %s.') %
+                    values['product']))
+                continue
+            order_lines = product_lines[(order.id, product.id)]
+            returnable_qty = sum(available[x.id] for x in order_lines)
+            if float_compare(
+                    values['qty'], returnable_qty,
+                    precision_digits=precision) > 0:
+                errors.append((number, _(
+                    'Only %s %s can still be returned from the order %s.') % (
+                    returnable_qty, product.display_name, order.name)))
+                continue
+            key = (order,) + self._get_refund_key(values)[1:]
+            refund = res.setdefault(key, {
+                'qties': defaultdict(float),
+                'rows': [],
+            })
+            refund['rows'].append(number)
+            to_return = values['qty']
+            for line in order_lines:
+                quantity = min(to_return, available[line.id])
+                if quantity <= 0:
+                    continue
+                available[line.id] -= quantity
+                refund['qties'][line.id] += quantity
+                to_return -= quantity
+        return res
+
+    @api.model
+    def _create_refunds(self, refunds, session):
+        """Create the refund orders, each one with all its lines in a single
+        create, and check their returned quantities at once"""
+        refund_orders = self.env['pos.order']
+        for (order, refund_reference, date), refund in refunds.items():
+            refund_order = order._create_refund(
+                session, refund['qties'], date and {'date_order': date})
+            if refund_reference:
+                # The name is forced by the sequence when the order is created
+                refund_order.name = refund_reference
+            refund_orders |= refund_order
+        refund_orders.mapped('lines')._check_return_qty()
+        return refund_orders
+
+    @api.model
+    def _import_chunk(self, rows, session, errors):
+        """Import the refunds of a chunk in a savepoint. When the chunk
+        fails, its refunds are imported again one by one to report the
+        failing rows and keep the others.
+
+        :return: number of refund orders created
+        """
+        refunds = self._prepare_refunds(rows, errors)
+        try:
+            with self.env.cr.savepoint():
+                return len(self._create_refunds(refunds, session))
+        except Exception:
+            _logger.info(
+                'Refunds import: chunk failed, importing its refunds one by '
+                'one', exc_info=True)
+            self.env.invalidate_all()
+        count = 0
+        for key, refund in refunds.items():
+            try:
+                with self.env.cr.savepoint():
+                    count += len(self._create_refunds(
+                        OrderedDict([(key, refund)]), session))
+            except Exception as e:
+                errors.extend(
+                    (number, tools.ustr(e)) for number in refund['rows'])
+        return count
+
+    @api.model
+    def import_refunds(self, stream, file_format='csv', chunk_size=500,
+                       session=None, auto_commit=False):
+        """Import the historical refunds of a file, see the class for the
+        expected columns. Invalid rows are reported and don't prevent the
+        other rows to be imported.
+
+        :param stream: text file object, e.g. ``open(path)``
+        :param file_format: 'csv' or 'jsonl' (a JSON object per line)
+        :param session: session the refunds are registered in, by default
+            the open session of the user
+        :param auto_commit: commit after each chunk, for big imports run
+            from a shell
+        :return: dict {'rows': number of rows read,
+            'refunds': number of refund orders created,
+            'errors': list of (row number, error message)}
+        """
+        session = session or self.env['pos.order']._get_refund_session()
+        errors = []
+        row_count = refund_count = 0
+        for rows in self._read_chunks(
+                stream, file_format, chunk_size, errors):
+            row_count = rows[-1][0]
+            refund_count += self._import_chunk(rows, session, errors)
+            if auto_commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+            # Keep the cache from growing with the file
+            self.env.invalidate_all()
+            _logger.info(
+                'Refunds import: %d rows read, %d refund orders created, '
+                '%d errors', row_count, refund_count, len(errors))
+        errors.sort()
+        return {
+            'rows': max([row_count] + [number for number, __ in errors]),
+            'refunds': refund_count,
+            'errors': errors,
+        }
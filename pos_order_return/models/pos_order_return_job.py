@@ -0,0 +1,125 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import logging
+
+from odoo import api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+
+class PosOrderReturnJob(models.Model):
+    _name = 'pos.order.return.job'
+    _description = 'PoS Refund Order Deferred Job'
+    _order = 'id'
+
+    _max_attempts = 5
+
+    order_id = fields.Many2one(
+        comodel_name='pos.order',
+        string='Refund Order',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade',
+    )
+    session_id = fields.Many2one(
+        related='order_id.session_id',
+        string='Session',
+        readonly=True,
+        store=True,
+    )
+    job_type = fields.Selection(
+        selection=[
+            ('invoice', 'Refund Invoice'),
+            ('picking', 'Return Picking'),
+        ],
+        string='Type',
+        required=True,
+        readonly=True,
+    )
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pending'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        string='State',
+        required=True,
+        readonly=True,
+        index=True,
+        default='pending',
+    )
+    attempts = fields.Integer(
+        string='Attempts',
+        readonly=True,
+    )
+    error = fields.Text(
+        string='Last Error',
+        readonly=True,
+    )
+
+    @api.model
+    def _enqueue(self, orders, job_type):
+        for order in orders:
+            self.create({
+                'order_id': order.id,
+                'job_type': job_type,
+            })
+
+    def _run(self):
+        self.ensure_one()
+        order = self.order_id
+        if self.job_type == 'invoice' and not order.invoice_id:
+            order._action_pos_order_invoice()
+        elif self.job_type == 'picking' and not order.picking_id:
+            order._action_create_picking_return()
+
+    @api.multi
+    def _process(self, raise_error=False):
+        """Run the jobs, each one in its own savepoint so that a failing job
+        doesn't prevent the others to be done. Failing jobs are retried
+        until they reach the maximum number of attempts."""
+        for job in self:
+            try:
+                with self.env.cr.savepoint():
+                    job._run()
+            except Exception as e:
+                if raise_error:
+                    raise
+                _logger.exception('PoS refund job %d failed', job.id)
+                attempts = job.attempts + 1
+                job.write({
+                    'attempts': attempts,
+                    'error': tools.ustr(e),
+                    'state': (attempts >= self._max_attempts and 'failed' or
+                              'pending'),
+                })
+            else:
+                job.write({
+                    'attempts': job.attempts + 1,
+                    'error': False,
+                    'state': 'done',
+                })
+        return True
+
+    @api.model
+    def _cron_process_jobs(self, limit=100):
+        jobs = self.search([('state', '=', 'pending')], limit=limit)
+        while jobs:
+            jobs._process()
+            # Commit each batch so that a later failure doesn't lose it
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+            jobs = self.search([
+                ('state', '=', 'pending'),
+                ('id', '>', jobs[-1].id),
+            ], limit=limit)
+        return True
+
+    @api.multi
+    def action_retry(self):
+        self.write({
+            'state': 'pending',
+            'attempts': 0,
+        })
+        return True
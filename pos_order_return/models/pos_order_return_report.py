@@ -0,0 +1,188 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, fields, models
+from odoo.tools import str2bool
+
+
+class PosOrderReturnReport(models.Model):
+    """Sold and returned quantities of the PoS order lines, by day, product,
+    point of sale and cashier. The returned quantities are the refunded
+    quantities stored on the sold lines, so that returns are counted in the
+    period of the sale they return.
+
+    The view can be materialized for big histories, with the system
+    parameter ``pos_order_return.report_materialized``. It is then refreshed
+    by a cron.
+    """
+    _name = 'pos.order.return.report'
+    _description = 'PoS Returns Analysis'
+    _auto = False
+    _order = 'date desc'
+
+    date = fields.Date(
+        readonly=True,
+    )
+    product_id = fields.Many2one(
+        comodel_name='product.product',
+        string='Product',
+        readonly=True,
+    )
+    product_categ_id = fields.Many2one(
+        comodel_name='product.category',
+        string='Product Category',
+        readonly=True,
+    )
+    pos_categ_id = fields.Many2one(
+        comodel_name='pos.category',
+        string='PoS Category',
+        readonly=True,
+    )
+    config_id = fields.Many2one(
+        comodel_name='pos.config',
+        string='Point of Sale',
+        readonly=True,
+    )
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Cashier',
+        readonly=True,
+    )
+    company_id = fields.Many2one(
+        comodel_name='res.company',
+        string='Company',
+        readonly=True,
+    )
+    line_count = fields.Integer(
+        string='Sold Lines',
+        readonly=True,
+    )
+    returned_line_count = fields.Integer(
+        string='Returned Lines',
+        readonly=True,
+    )
+    sold_qty = fields.Float(
+        string='Sold Quantity',
+        readonly=True,
+    )
+    returned_qty = fields.Float(
+        string='Returned Quantity',
+        readonly=True,
+    )
+    sold_amount = fields.Float(
+        string='Sold Amount',
+        readonly=True,
+    )
+    returned_amount = fields.Float(
+        string='Returned Amount',
+        readonly=True,
+    )
+    return_rate = fields.Float(
+        string='Return Rate (%)',
+        readonly=True,
+        group_operator='avg',
+        help="Returned quantity over sold quantity",
+    )
+
+    @api.model
+    def _is_materialized(self):
+        return str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'pos_order_return.report_materialized'), False)
+
+    @api.model
+    def _get_view_kind(self):
+        """'v' for a view, 'm' for a materialized view, None if missing"""
+        self._cr.execute(
+            "SELECT relkind FROM pg_class WHERE relname = %s", (self._table,))
+        row = self._cr.fetchone()
+        return row and row[0]
+
+    @api.model
+    def _query(self):
+        return """
+            SELECT
+                min(l.id) AS id,
+                o.date_order::date AS date,
+                l.product_id,
+                pt.categ_id AS product_categ_id,
+                pt.pos_categ_id,
+                s.config_id,
+                o.user_id,
+                o.company_id,
+                count(*) AS line_count,
+                sum(CASE WHEN l.refunded_qty > 0 THEN 1 ELSE 0 END)
+                    AS returned_line_count,
+                sum(l.qty) AS sold_qty,
+                sum(l.refunded_qty) AS returned_qty,
+                sum(l.qty * l.price_unit * (100 - l.discount) / 100)
+                    AS sold_amount,
+                sum(l.refunded_qty * l.price_unit * (100 - l.discount) / 100)
+                    AS returned_amount,
+                100.0 * sum(l.refunded_qty) / NULLIF(sum(l.qty), 0)
+                    AS return_rate
+            FROM pos_order_line l
+            JOIN pos_order o ON o.id = l.order_id
+            JOIN pos_session s ON s.id = o.session_id
+            JOIN product_product p ON p.id = l.product_id
+            JOIN product_template pt ON pt.id = p.product_tmpl_id
+            WHERE o.returned_order_id IS NULL
+                AND o.state NOT IN ('draft', 'cancel')
+                AND l.qty > 0
+            GROUP BY o.date_order::date, l.product_id, pt.categ_id,
+                pt.pos_categ_id, s.config_id, o.user_id, o.company_id
+        """
+
+    @api.model_cr
+    def init(self):
+        kind = self._get_view_kind()
+        if kind == 'm':
+            self._cr.execute("DROP MATERIALIZED VIEW %s" % self._table)
+        elif kind == 'v':
+            self._cr.execute("DROP VIEW %s" % self._table)
+        if self._is_materialized():
+            self._cr.execute("CREATE MATERIALIZED VIEW %s AS (%s)" % (
+                self._table, self._query()))
+            # Required to refresh the view without blocking its readers
+            self._cr.execute("CREATE UNIQUE INDEX %s_id_index ON %s (id)" % (
+                self._table, self._table))
+            for name in ('date', 'product_id', 'config_id'):
+                self._cr.execute("CREATE INDEX %s_%s_index ON %s (%s)" % (
+                    self._table, name, self._table, name))
+        else:
+            self._cr.execute("CREATE VIEW %s AS (%s)" % (
+                self._table, self._query()))
+
+    @api.model
+    def _cron_refresh(self):
+        """Refresh the materialized view, or recreate the view when the
+        system parameter was changed"""
+        materialized = self._is_materialized()
+        if materialized != (self._get_view_kind() == 'm'):
+            self.init()
+        elif materialized:
+            self._cr.execute(
+                "REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+
+    @api.model
+    def read_group(self, domain, fields, groupby, offset=0, limit=None,
+                   orderby=False, lazy=True):
+        """The return rate of a group is computed from its quantities
+        instead of being the average of the rates of its rows"""
+        field_names = [x.split(':')[0] for x in fields]
+        extra_fields = []
+        if 'return_rate' in field_names:
+            extra_fields = [
+                x for x in ('sold_qty', 'returned_qty')
+                if x not in field_names]
+        res = super(PosOrderReturnReport, self).read_group(
+            domain, list(fields) + extra_fields, groupby, offset=offset,
+            limit=limit, orderby=orderby, lazy=lazy)
+        if 'return_rate' in field_names:
+            for group in res:
+                sold_qty = group.get('sold_qty')
+                group['return_rate'] = sold_qty and (
+                    100.0 * (group.get('returned_qty') or 0.0) /
+                    sold_qty) or 0.0
+                for name in extra_fields:
+                    del group[name]
+        return res
@@ -0,0 +1,30 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, models
+
+
+class PosSession(models.Model):
+    _inherit = 'pos.session'
+
+    @api.multi
+    def action_pos_session_close(self):
+        # Deferred refund invoices must exist before the session accounting
+        # is made. The return pickings don't block the closing, they are
+        # left to the cron, e.g. until the returned pickings are done.
+        self.env['pos.order.return.job'].search([
+            ('session_id', 'in', self.ids),
+            ('job_type', '=', 'invoice'),
+            ('state', '!=', 'done'),
+        ])._process(raise_error=True)
+        self.mapped('order_ids').filtered(
+            lambda x: x.returned_order_id.invoice_id and
+            not x.invoice_id and x.state == 'paid' and
+            x.session_id.config_id.group_refund_invoices
+        )._create_grouped_refund_invoices()
+        self.mapped('order_ids').filtered(
+            lambda x: x.returned_order_id and not x.picking_id and
+            x.state in ('paid', 'invoiced', 'done') and
+            x.session_id.config_id.group_return_pickings
+        )._create_grouped_picking_returns()
+        return super(PosSession, self).action_pos_session_close()
@@ -0,0 +1,15 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import fields, models
+
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    pos_refund_line_id = fields.Many2one(
+        comodel_name='pos.order.line',
+        string='PoS Refund Line',
+        readonly=True,
+        index=True,
+    )
@@ -0,0 +1,194 @@
+/* Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+   License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html). */
+
+odoo.define("pos_order_return.models", function (require) {
+    "use strict";
+
+    var core = require("web.core");
+    var models = require("point_of_sale.models");
+    var rpc = require("web.rpc");
+
+    var _t = core._t;
+
+    var _posmodel_super = models.PosModel.prototype;
+    models.PosModel = models.PosModel.extend({
+        initialize: function () {
+            // Returnable orders already fetched, by receipt reference
+            this.return_order_cache = {};
+            return _posmodel_super.initialize.apply(this, arguments);
+        },
+        fetch_return_order: function (reference) {
+            // The server is always asked, to see the returns made by other
+            // PoS, the cache is only used when it can't be reached
+            var self = this;
+            return rpc.query({
+                model: "pos.order",
+                method: "get_return_data_from_ui",
+                args: [[reference, _t("Order ") + reference]],
+            }, {
+                timeout: 7500,
+                shadow: true,
+            }).then(function (data) {
+                if (data) {
+                    self.return_order_cache[reference] = data;
+                    self.return_order_cache[data.pos_reference] = data;
+                } else {
+                    delete self.return_order_cache[reference];
+                }
+                return data;
+            }, function () {
+                var cached = self.return_order_cache[reference];
+                if (cached) {
+                    return $.when(cached);
+                }
+                return $.Deferred().reject().promise();
+            });
+        },
+        // Quantities returned by the orders of this PoS that the server
+        // doesn't know yet: the orders being made and the unsent ones
+        get_pending_return_quantities: function (ignored_line) {
+            var quantities = {};
+            var add = function (returned_line_id, qty) {
+                if (returned_line_id) {
+                    quantities[returned_line_id] =
+                        (quantities[returned_line_id] || 0) - qty;
+                }
+            };
+            var unsent_uids = {};
+            _.each(this.db.get_orders(), function (order) {
+                unsent_uids[order.id] = true;
+                _.each(order.data.lines, function (command) {
+                    add(command[2].returned_line_id, command[2].qty);
+                });
+            });
+            _.each(this.get_order_list(), function (order) {
+                if (unsent_uids[order.uid]) {
+                    return;
+                }
+                _.each(order.get_orderlines(), function (line) {
+                    if (line !== ignored_line) {
+                        add(line.returned_line_id, line.get_quantity());
+                    }
+                });
+            });
+            return quantities;
+        },
+        // Quantities of the lines of an order looked up that can still be
+        // returned from this PoS, by line id
+        get_returnable_quantities: function (return_data, ignored_line) {
+            var pending = this.get_pending_return_quantities(ignored_line);
+            var quantities = {};
+            _.each(return_data.lines, function (line) {
+                quantities[line.id] =
+                    line.returnable_qty - (pending[line.id] || 0);
+            });
+            return quantities;
+        },
+        get_cached_return_order: function (order_id) {
+            return _.findWhere(
+                _.values(this.return_order_cache), {id: order_id});
+        },
+        // Once sent, the returns of this PoS are part of the cached data,
+        // so that it can still be trusted while offline
+        _save_to_server: function (orders) {
+            var self = this;
+            return _posmodel_super._save_to_server.apply(
+                this, arguments).then(function (server_ids) {
+                _.each(orders, function (order) {
+                    var return_data = self.get_cached_return_order(
+                        order.data.returned_order_id);
+                    if (!return_data) {
+                        return;
+                    }
+                    var lines = _.indexBy(return_data.lines, "id");
+                    _.each(order.data.lines, function (command) {
+                        var line = lines[command[2].returned_line_id];
+                        if (line) {
+                            line.returnable_qty += command[2].qty;
+                        }
+                    });
+                });
+                return server_ids;
+            });
+        },
+    });
+
+    var _order_super = models.Order.prototype;
+    models.Order = models.Order.extend({
+        init_from_JSON: function (json) {
+            _order_super.init_from_JSON.apply(this, arguments);
+            this.returned_order_id = json.returned_order_id;
+        },
+        export_as_JSON: function () {
+            var json = _order_super.export_as_JSON.apply(this, arguments);
+            json.returned_order_id = this.returned_order_id;
+            return json;
+        },
+        // Sold products would be left out of the return picking
+        add_product: function (product, options) {
+            var extras = options && options.extras;
+            if (this.returned_order_id &&
+                    !(extras && extras.returned_line_id)) {
+                this.pos.gui.show_popup("error", {
+                    title: _t("Return Order"),
+                    body: _t("Products can't be sold in a return order, " +
+                             "validate the return first."),
+                });
+                return;
+            }
+            return _order_super.add_product.apply(this, arguments);
+        },
+    });
+
+    var _orderline_super = models.Orderline.prototype;
+    models.Orderline = models.Orderline.extend({
+        init_from_JSON: function (json) {
+            _orderline_super.init_from_JSON.apply(this, arguments);
+            this.returned_line_id = json.returned_line_id;
+        },
+        export_as_JSON: function () {
+            var json = _orderline_super.export_as_JSON.apply(this, arguments);
+            json.returned_line_id = this.returned_line_id;
+            return json;
+        },
+        set_quantity: function (quantity) {
+            if (this.returned_line_id && quantity !== "remove") {
+                var error = this.check_return_quantity(parseFloat(quantity));
+                if (error) {
+                    this.pos.gui.show_popup("error", {
+                        title: _t("Return Order"),
+                        body: error,
+                    });
+                    return;
+                }
+            }
+            return _orderline_super.set_quantity.apply(this, arguments);
+        },
+        check_return_quantity: function (quantity) {
+            if (quantity > 0) {
+                return _t("A returned product can't be sold, its quantity " +
+                          "must stay negative.");
+            }
+            var return_data = this.pos.get_cached_return_order(
+                this.order.returned_order_id);
+            if (!return_data) {
+                return false;
+            }
+            var returnable_qty = this.pos.get_returnable_quantities(
+                return_data, this)[this.returned_line_id];
+            if (-quantity > returnable_qty) {
+                return _.str.sprintf(
+                    _t("Only %s %s can still be returned."),
+                    returnable_qty, this.product.display_name);
+            }
+            return false;
+        },
+        can_be_merged_with: function (orderline) {
+            if (this.returned_line_id || orderline.returned_line_id) {
+                return false;
+            }
+            return _orderline_super.can_be_merged_with.apply(this, arguments);
+        },
+    });
+
+});
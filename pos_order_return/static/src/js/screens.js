@@ -0,0 +1,202 @@
+/* Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+   License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html). */
+
+odoo.define("pos_order_return.screens", function (require) {
+    "use strict";
+
+    var core = require("web.core");
+    var gui = require("point_of_sale.gui");
+    var screens = require("point_of_sale.screens");
+
+    var QWeb = core.qweb;
+    var _t = core._t;
+
+    var ReturnOrderScreenWidget = screens.ScreenWidget.extend({
+        template: "ReturnOrderScreenWidget",
+
+        show: function () {
+            this._super();
+            this.return_data = false;
+            this.render_lines();
+            this.$("input.return-order-search").val("").focus();
+        },
+        renderElement: function () {
+            var self = this;
+            this._super();
+            this.$(".back").click(function () {
+                self.gui.back();
+            });
+            this.$(".next").click(function () {
+                self.create_return();
+            });
+            this.$("input.return-order-search").on("keypress", function (ev) {
+                if (ev.which === 13) {
+                    self.search($(this).val().trim());
+                }
+            });
+        },
+        // Receipt barcodes aren't known by the barcode nomenclature
+        barcode_error_action: function (code) {
+            this.$("input.return-order-search").val(code.code);
+            this.search(code.code);
+        },
+        search: function (reference) {
+            var self = this;
+            if (!reference) {
+                return;
+            }
+            this.pos.fetch_return_order(reference).then(function (data) {
+                if (data) {
+                    // The cached quantities may have been used up already
+                    var quantities = self.pos.get_returnable_quantities(data);
+                    if (!_.some(data.lines, function (line) {
+                        return quantities[line.id] > 0;
+                    })) {
+                        data = false;
+                    }
+                }
+                if (!data) {
+                    self.gui.show_popup("error", {
+                        title: _t("Order not found"),
+                        body: _t("There is no order with something left " +
+                                 "to return for this reference."),
+                    });
+                }
+                self.return_data = data;
+                self.render_lines();
+            }, function () {
+                self.gui.show_popup("error", {
+                    title: _t("Network Error"),
+                    body: _t("The order can not be loaded while offline " +
+                             "if it wasn't looked up before."),
+                });
+            });
+        },
+        render_lines: function () {
+            var self = this;
+            var lines = [];
+            if (this.return_data) {
+                var quantities = this.pos.get_returnable_quantities(
+                    this.return_data);
+                lines = _.filter(this.return_data.lines, function (line) {
+                    return quantities[line.id] > 0;
+                });
+            }
+            this.$(".return-order-lines").html(QWeb.render(
+                "ReturnOrderLines", {
+                    widget: this,
+                    return_data: this.return_data,
+                    lines: _.map(lines, function (line) {
+                        return _.extend({}, line, {
+                            product: self.pos.db.get_product_by_id(
+                                line.product_id),
+                            returnable_qty: quantities[line.id],
+                        });
+                    }),
+                }));
+            this.$(".next").toggleClass("oe_hidden", !lines.length);
+        },
+        get_return_quantities: function () {
+            var lines = _.indexBy(this.return_data.lines, "id");
+            var returnable_qties = this.pos.get_returnable_quantities(
+                this.return_data);
+            var quantities = {};
+            var errors = [];
+            this.$("input.return-qty").each(function () {
+                var line = lines[$(this).data("line-id")];
+                var qty = parseFloat($(this).val()) || 0;
+                if (qty > returnable_qties[line.id]) {
+                    errors.push(_.str.sprintf(
+                        _t("%s: only %s can still be returned."),
+                        line.product_name, returnable_qties[line.id]));
+                } else if (qty > 0) {
+                    quantities[line.id] = qty;
+                }
+            });
+            if (errors.length) {
+                this.gui.show_popup("error", {
+                    title: _t("Return Order"),
+                    body: errors.join("\n"),
+                });
+                return {};
+            }
+            return quantities;
+        },
+        create_return: function () {
+            var self = this;
+            var data = this.return_data;
+            // Rejected before the order is made, as the server would refuse
+            // it and it would block the synchronization of the next orders
+            var quantities = this.get_return_quantities();
+            if (_.isEmpty(quantities)) {
+                return;
+            }
+            var returnable_qties = this.pos.get_returnable_quantities(data);
+            var missing = _.filter(data.lines, function (line) {
+                return returnable_qties[line.id] > 0 &&
+                    !self.pos.db.get_product_by_id(line.product_id);
+            });
+            if (missing.length) {
+                this.gui.show_popup("confirm", {
+                    title: _t("Products not available"),
+                    body: _.str.sprintf(
+                        _t("These products aren't available in this point " +
+                           "of sale and can't be returned here: %s. Return " +
+                           "the other products?"),
+                        _.pluck(missing, "product_name").join(", ")),
+                    confirm: function () {
+                        self.create_return_order(quantities);
+                    },
+                });
+                return;
+            }
+            this.create_return_order(quantities);
+        },
+        create_return_order: function (quantities) {
+            var self = this;
+            var data = this.return_data;
+            var order = this.pos.add_new_order();
+            order.returned_order_id = data.id;
+            var partner = data.partner_id &&
+                this.pos.db.get_partner_by_id(data.partner_id);
+            if (partner) {
+                order.set_client(partner);
+            }
+            _.each(data.lines, function (line) {
+                var product = self.pos.db.get_product_by_id(line.product_id);
+                if (!quantities[line.id] || !product) {
+                    return;
+                }
+                order.add_product(product, {
+                    quantity: -quantities[line.id],
+                    price: line.price_unit,
+                    discount: line.discount,
+                    merge: false,
+                    extras: {returned_line_id: line.id},
+                });
+            });
+            this.gui.show_screen("products");
+        },
+    });
+    gui.define_screen({
+        name: "return_order",
+        widget: ReturnOrderScreenWidget,
+    });
+
+    var ReturnOrderButton = screens.ActionButtonWidget.extend({
+        template: "ReturnOrderButton",
+        button_click: function () {
+            this.gui.show_screen("return_order");
+        },
+    });
+    screens.define_action_button({
+        name: "return_order",
+        widget: ReturnOrderButton,
+    });
+
+    return {
+        ReturnOrderScreenWidget: ReturnOrderScreenWidget,
+        ReturnOrderButton: ReturnOrderButton,
+    };
+
+});
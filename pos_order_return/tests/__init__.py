@@ -1,2 +1,3 @@
 
 from . import test_pos_order_return
+from . import test_concurrency
@@ -0,0 +1,106 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import threading
+
+from psycopg2.extensions import TransactionRollbackError
+
+from odoo import SUPERUSER_ID, api
+from odoo.exceptions import ValidationError
+from odoo.tests import common
+
+
+@common.at_install(False)
+@common.post_install(True)
+class TestPOSOrderReturnConcurrency(common.TransactionCase):
+    """Returns of the same order made at the same time by several workers,
+    each one in its own committed transaction. The data is committed so
+    that the workers see it, and removed at the end of the test.
+    """
+    # Workers returning the same order at the same time
+    workers = 4
+    # Attempts of a worker, as the server retries the serialization errors
+    max_attempts = 5
+
+    def setUp(self):
+        super(TestPOSOrderReturnConcurrency, self).setUp()
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            self.product_id = env['product.product'].create({
+                'name': 'Concurrent returns product',
+                'type': 'consu',
+                'taxes_id': False,
+            }).id
+            config = env['pos.config'].create({
+                'name': 'Concurrent returns',
+            })
+            config.open_session_cb()
+            self.config_id = config.id
+            self.session_id = config.current_session_id.id
+            self.order_ids = [env['pos.order'].create({
+                'session_id': self.session_id,
+                'pricelist_id': config.pricelist_id.id,
+                'lines': [(0, 0, {
+                    'name': 'POSLINE/%04d' % index,
+                    'product_id': self.product_id,
+                    'price_unit': 10.0,
+                    'qty': 1.0,
+                })],
+            }).id for index in range(2)]
+        self.addCleanup(self._remove_data)
+
+    def _remove_data(self):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            orders = env['pos.order'].browse(self.order_ids)
+            (orders.mapped('refund_order_ids') | orders).unlink()
+            env['pos.session'].browse(self.session_id).unlink()
+            env['pos.config'].browse(self.config_id).unlink()
+            env['product.product'].browse(self.product_id).unlink()
+
+    def _return_order(self, order_id, barrier, results):
+        """Return the whole order in a new transaction, retried on the
+        serialization errors like the server does"""
+        with api.Environment.manage():
+            barrier.wait()
+            for __ in range(self.max_attempts):
+                try:
+                    with self.registry.cursor() as cr:
+                        env = api.Environment(cr, SUPERUSER_ID, {})
+                        order = env['pos.order'].browse(order_id)
+                        order._refund(dict(
+                            (line.id, line.qty) for line in order.lines))
+                    results.append((order_id, 'done'))
+                    return
+                except TransactionRollbackError:
+                    continue
+                except ValidationError:
+                    results.append((order_id, 'refused'))
+                    return
+            results.append((order_id, 'failed'))
+
+    def test_pos_order_concurrent_returns(self):
+        results = []
+        barrier = threading.Barrier(self.workers * len(self.order_ids))
+        threads = [
+            threading.Thread(
+                target=self._return_order,
+                args=(order_id, barrier, results))
+            for order_id in self.order_ids
+            for __ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for order_id in self.order_ids:
+            order_results = [x[1] for x in results if x[0] == order_id]
+            # Each order is returned once, the other workers are refused
+            self.assertEqual(order_results.count('done'), 1)
+            self.assertEqual(
+                order_results.count('refused'), self.workers - 1)
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            for line in env['pos.order'].browse(self.order_ids).mapped(
+                    'lines'):
+                self.assertEqual(line.refunded_qty, 1.0)
+                self.assertEqual(line.returnable_qty, 0.0)
@@ -2,6 +2,9 @@
 # Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
 
+import io
+
+from odoo.exceptions import UserError, ValidationError
 from odoo.tests import common
 
 
@@ -100,3 +103,267 @@ class TestPOSOrderReturn(common.HttpCase):
         # Partner balance is 1350
         self.assertEqual(sum(
             self.partner.mapped('invoice_ids.amount_total_signed')), 1350)
+
+    def test_pos_order_line_returnable_qty(self):
+        lines = self.pos_order.lines
+        self.assertEqual(lines.mapped('returnable_qty'), [2.0, 2.0, 2.0])
+        partial_refund = self.env['pos.partial.return.wizard'].with_context({
+            'active_ids': self.pos_order.ids,
+            'active_id': self.pos_order.id,
+        }).create({})
+        partial_refund.line_ids[0].qty = 1
+        partial_refund.confirm()
+        self.assertEqual(lines.mapped('returnable_qty'), [1.0, 2.0, 2.0])
+        self.assertEqual(lines.mapped('refunded_qty'), [1.0, 0.0, 0.0])
+        self.assertEqual(self.pos_order.refund_order_qty, 1)
+        refund_line = self.pos_order.refund_order_ids.lines
+        self.assertEqual(
+            lines._get_returnable_qty(refund_line.ids),
+            dict((line.id, 2.0) for line in lines))
+        # The summary follows the changes of the refund lines
+        refund_line.qty = -2.0
+        self.assertEqual(lines.mapped('returnable_qty'), [0.0, 2.0, 2.0])
+        refund_line.unlink()
+        self.assertEqual(lines.mapped('refunded_qty'), [0.0, 0.0, 0.0])
+
+    def test_pos_order_return_qty_constraint(self):
+        self.pos_order.refund()
+        refund_lines = self.pos_order.refund_order_ids.lines
+        with self.assertRaises(ValidationError):
+            refund_lines[:2].write({'qty': -3.0})
+        # The second refund has nothing left to return
+        self.pos_order.refund()
+        second_refund = self.pos_order.refund_order_ids - refund_lines.mapped(
+            'order_id')
+        self.assertFalse(second_refund.lines)
+        with self.assertRaises(ValidationError):
+            self.env['pos.order.line'].create({
+                'name': 'POSLINE/0004',
+                'order_id': second_refund.id,
+                'product_id': self.product_1.id,
+                'returned_line_id': self.pos_order.lines[0].id,
+                'price_unit': 450,
+                'qty': -1.0,
+            })
+
+    def test_pos_order_refund_batch(self):
+        res = self.pos_order.refund_batch()
+        refund_order = self.pos_order.refund_order_ids
+        self.assertEqual(res, {str(self.pos_order.id): refund_order.id})
+        self.assertEqual(refund_order.lines.mapped('qty'), [-2.0] * 3)
+        self.assertEqual(
+            refund_order.lines.mapped('returned_line_id'),
+            self.pos_order.lines)
+        # Nothing left to return
+        self.assertEqual(self.pos_order.refund_batch(), {})
+
+    def test_pos_order_refund_import(self):
+        self.product_1.default_code = 'TEST-P1'
+        self.product_2.barcode = '2000000000015'
+        name = self.pos_order.name
+        stream = io.StringIO(
+            'order_reference,product,qty,refund_reference,date\n'
+            '%(name)s,TEST-P1,3,R1,2018-01-05 10:00:00\n'
+            '%(name)s,2000000000015,1,R1,2018-01-05 10:00:00\n'
+            '%(name)s,TEST-P1,2,,\n'
+            'UNKNOWN,TEST-P1,1,,\n'
+            '%(name)s,TEST-P1,abc,,\n' % {'name': name})
+        res = self.env['pos.order.refund.import'].import_refunds(
+            stream, chunk_size=2)
+        self.assertEqual(res['rows'], 5)
+        self.assertEqual(res['refunds'], 1)
+        self.assertEqual([x[0] for x in res['errors']], [3, 4, 5])
+        refund_order = self.pos_order.refund_order_ids
+        self.assertEqual(refund_order.name, 'R1')
+        self.assertEqual(refund_order.date_order, '2018-01-05 10:00:00')
+        self.assertEqual(
+            sum(refund_order.lines.filtered(
+                lambda x: x.product_id == self.product_1).mapped('qty')),
+            -3.0)
+        self.assertEqual(
+            refund_order.lines.filtered(
+                lambda x: x.product_id == self.product_2).qty, -1.0)
+        self.assertEqual(
+            sum(self.pos_order.lines.mapped('returnable_qty')), 2.0)
+        # JSON lines
+        stream = io.StringIO(
+            '{"order_reference": "%s", "product": "TEST-P1", "qty": 1}\n'
+            'not json\n' % name)
+        res = self.env['pos.order.refund.import'].import_refunds(
+            stream, file_format='jsonl')
+        self.assertEqual(res['refunds'], 1)
+        self.assertEqual([x[0] for x in res['errors']], [2])
+        self.assertEqual(
+            sum(self.pos_order.lines.filtered(
+                lambda x: x.product_id == self.product_1).mapped(
+                'returnable_qty')), 0.0)
+
+    def test_pos_order_return_report(self):
+        self.pos_order._refund({self.pos_order.lines[0].id: 1.0})
+        res = self.env['pos.order.return.report'].read_group(
+            [('product_id', 'in', (self.product_1 | self.product_2).ids)],
+            ['sold_qty', 'returned_qty', 'return_rate'], ['product_id'],
+            orderby='product_id')
+        self.assertEqual(
+            [(x['sold_qty'], x['returned_qty'], x['return_rate'])
+             for x in res],
+            [(4.0, 1.0, 25.0), (2.0, 0.0, 0.0)])
+        self.assertNotIn('sold_qty', self.env[
+            'pos.order.return.report'].read_group(
+                [], ['return_rate'], ['config_id'])[0])
+
+    def test_pos_order_refund_deferred(self):
+        self.pos_config.return_deferred_processing = True
+        self.pos_order.refund()
+        refund_order = self.pos_order.refund_order_ids
+        pos_make_payment = self.env['pos.make.payment'].with_context({
+            'active_ids': refund_order.ids,
+            'active_id': refund_order.id,
+        }).create({})
+        pos_make_payment.with_context(active_id=refund_order.id).check()
+        self.assertFalse(refund_order.invoice_id)
+        self.assertFalse(refund_order.picking_id)
+        jobs = self.env['pos.order.return.job'].search([
+            ('order_id', '=', refund_order.id)])
+        self.assertEqual(
+            sorted(jobs.mapped('job_type')), ['invoice', 'picking'])
+        jobs._process()
+        self.assertEqual(jobs.mapped('state'), ['done', 'done'])
+        self.assertEqual(refund_order.invoice_id.refund_invoice_id,
+                         self.invoice)
+        return_moves = refund_order.picking_id.move_lines
+        self.assertTrue(return_moves)
+        self.assertTrue(
+            return_moves.mapped('origin_returned_move_id') <=
+            self.pos_order.picking_id.move_lines)
+
+    def test_pos_order_refund_deferred_without_picking(self):
+        self.pos_config.return_deferred_processing = True
+        # Nothing delivered, e.g. services only
+        self.pos_order.picking_id = False
+        refund_order = self.PosOrder.browse(self.pos_order.refund()['res_id'])
+        refund_order.create_picking()
+        self.assertFalse(self.env['pos.order.return.job'].search([
+            ('order_id', '=', refund_order.id),
+            ('job_type', '=', 'picking'),
+        ]))
+        self.pos_config.return_deferred_processing = False
+        self.assertFalse(refund_order._action_create_picking_return())
+
+    def test_pos_order_refund_cancelled_move(self):
+        refund_order = self.PosOrder.browse(self.pos_order.refund()['res_id'])
+        cancelled_move = self.pos_order.picking_id.move_lines.filtered(
+            lambda x: x.product_id == self.product_2)
+        cancelled_move.state = 'cancel'
+        move_qties = refund_order._prepare_picking_return_moves()
+        self.assertTrue(move_qties)
+        self.assertNotIn(cancelled_move, [x[0] for x in move_qties])
+
+    def test_pos_order_refund_grouped_pickings(self):
+        self.pos_config.group_return_pickings = True
+        refund_orders = self.PosOrder.browse()
+        for index in (0, 2):
+            wizard = self.env['pos.partial.return.wizard'].with_context({
+                'active_ids': self.pos_order.ids,
+                'active_id': self.pos_order.id,
+            }).create({})
+            wizard.line_ids[index].qty = 1
+            wizard.confirm()
+            refund_order = self.pos_order.refund_order_ids - refund_orders
+            pos_make_payment = self.env['pos.make.payment'].with_context({
+                'active_ids': refund_order.ids,
+                'active_id': refund_order.id,
+            }).create({})
+            pos_make_payment.with_context(active_id=refund_order.id).check()
+            self.assertFalse(refund_order.picking_id)
+            refund_orders |= refund_order
+        picking = refund_orders._create_grouped_picking_returns()
+        self.assertEqual(len(picking), 1)
+        self.assertEqual(refund_orders.mapped('picking_id'), picking)
+        self.assertEqual(
+            picking.move_lines.mapped('pos_refund_line_id'),
+            refund_orders.mapped('lines'))
+
+    def test_pos_order_refund_grouped_pickings_not_done(self):
+        self.pos_config.group_return_pickings = True
+        refund_order = self.PosOrder.browse(self.pos_order.refund()['res_id'])
+        self.pos_order.picking_id.state = 'assigned'
+        self.assertFalse(refund_order._create_grouped_picking_returns())
+        job = self.env['pos.order.return.job'].search([
+            ('order_id', '=', refund_order.id)])
+        self.assertEqual(job.job_type, 'picking')
+        with self.assertRaises(UserError):
+            job._process(raise_error=True)
+
+    def test_pos_order_refund_grouped_invoices(self):
+        self.pos_config.group_refund_invoices = True
+        refund_orders = self.PosOrder.browse()
+        for index in (0, 2):
+            wizard = self.env['pos.partial.return.wizard'].with_context({
+                'active_ids': self.pos_order.ids,
+                'active_id': self.pos_order.id,
+            }).create({})
+            wizard.line_ids[index].qty = 1
+            wizard.confirm()
+            refund_order = self.pos_order.refund_order_ids - refund_orders
+            pos_make_payment = self.env['pos.make.payment'].with_context({
+                'active_ids': refund_order.ids,
+                'active_id': refund_order.id,
+            }).create({})
+            pos_make_payment.with_context(active_id=refund_order.id).check()
+            self.assertFalse(refund_order.invoice_id)
+            self.assertEqual(refund_order.state, 'paid')
+            refund_orders |= refund_order
+        invoice = refund_orders._create_grouped_refund_invoices()
+        self.assertEqual(len(invoice), 1)
+        self.assertEqual(invoice.type, 'out_refund')
+        self.assertEqual(invoice.state, 'open')
+        self.assertEqual(invoice.refund_invoice_id, self.invoice)
+        self.assertEqual(invoice.amount_total, 900)
+        self.assertEqual(refund_orders.mapped('invoice_id'), invoice)
+        self.assertEqual(
+            refund_orders.mapped('state'), ['invoiced', 'invoiced'])
+        self.assertEqual(refund_orders.mapped('account_move'), invoice.move_id)
+
+    def test_pos_order_return_data_from_ui(self):
+        self.pos_order.pos_reference = 'Order 00042-001-0001'
+        self.assertFalse(self.PosOrder.get_return_data_from_ui('00042'))
+        data = self.PosOrder.get_return_data_from_ui(
+            ['00042-001-0001', 'Order 00042-001-0001'])
+        self.assertEqual(data['id'], self.pos_order.id)
+        self.assertEqual(len(data['lines']), 3)
+        self.pos_order.refund()
+        # A refund order isn't returnable and the order has nothing left
+        self.assertFalse(
+            self.PosOrder.get_return_data_from_ui('Order 00042-001-0001'))
+
+    def test_pos_order_partial_return_wizard_lines(self):
+        wizard_obj = self.env['pos.partial.return.wizard'].with_context({
+            'active_ids': self.pos_order.ids,
+            'active_id': self.pos_order.id,
+        })
+        partial_refund = wizard_obj.create({})
+        with self.assertRaises(UserError):
+            partial_refund.confirm()
+        partial_refund.line_ids[0].qty = 2
+        partial_refund.confirm()
+        # Fully returned lines are not proposed anymore
+        partial_refund = wizard_obj.create({})
+        self.assertEqual(
+            partial_refund.mapped('line_ids.pos_order_line_id'),
+            self.pos_order.lines[1:])
+        partial_refund = wizard_obj.with_context(
+            default_product_search='Test product 2').create({})
+        self.assertEqual(
+            partial_refund.mapped('line_ids.pos_order_line_id.product_id'),
+            self.product_2)
+        # Quantities typed are kept when searching another product
+        partial_refund.line_ids.qty = 1
+        partial_refund.product_search = 'Test product 1'
+        partial_refund._onchange_product_search()
+        self.assertEqual(
+            partial_refund.mapped('line_ids.pos_order_line_id'),
+            self.pos_order.lines[1:])
+        self.assertEqual(
+            partial_refund.line_ids.filtered('qty').pos_order_line_id,
+            self.pos_order.lines[1])
@@ -2,7 +2,8 @@
 # Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
 
-from odoo import api, fields, models
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
 
 
 class PosPartialReturnWizard(models.TransientModel):
@@ -17,29 +18,67 @@ class PosPartialReturnWizard(models.TransientModel):
         inverse_name='wizard_id',
         string='Lines to Return',
     )
+    product_search = fields.Char(
+        string='Product',
+        help="Only show the lines of the products matching this name, "
+             "internal reference or barcode.",
+    )
 
     def confirm(self):
         self.ensure_one()
+        if not self.line_ids.filtered('qty'):
+            raise UserError(_(
+                "Please specify at least one non-zero quantity."))
         return self[0].order_id.partial_refund(self[0])
 
+    @api.model
+    def _prepare_line_values(self, order, product_search=False,
+                             quantities=None):
+        """Lines of the order that still have something to return, filtered
+        on the products matching ``product_search`` if given
+
+        :param quantities: dict {pos.order.line id: quantity to return}
+            already typed, kept on their lines, which are always proposed
+        """
+        quantities = quantities or {}
+        lines = order.lines.filtered(lambda x: x.returnable_qty > 0)
+        if product_search:
+            products = self.env['product.product'].browse([
+                x[0] for x in self.env['product.product'].name_search(
+                    product_search,
+                    args=[('id', 'in', lines.mapped('product_id').ids)],
+                    limit=None)])
+            lines = lines.filtered(
+                lambda x: x.product_id in products or quantities.get(x.id))
+        return [(0, 0, {
+            'pos_order_line_id': line.id,
+            'initial_qty': line.qty,
+            'max_returnable_qty': line.returnable_qty,
+            'qty': quantities.get(line.id, 0.0),
+        }) for line in lines]
+
     @api.model
     def default_get(self, fields):
         order_obj = self.env['pos.order']
         res = super(PosPartialReturnWizard, self).default_get(fields)
         order = order_obj.browse(self.env.context.get('active_id', False))
         if order:
-            line_ids = []
-            for line in order.lines:
-                line_ids.append((0, 0, {
-                    'pos_order_line_id': line.id,
-                    'initial_qty': line.qty,
-                    'max_returnable_qty': line.max_returnable_qty([]),
-                }))
             res.update({
                 'order_id': order.id,
-                'line_ids': line_ids})
+                'line_ids': self._prepare_line_values(
+                    order, res.get('product_search')),
+            })
         return res
 
+    @api.onchange('product_search')
+    def _onchange_product_search(self):
+        if self.order_id:
+            quantities = dict(
+                (x.pos_order_line_id.id, x.qty)
+                for x in self.line_ids if x.qty)
+            self.line_ids = [(5, 0, 0)] + self._prepare_line_values(
+                self.order_id, self.product_search, quantities)
+
 
 class PosPartialReturnWizardLine(models.TransientModel):
     _name = 'pos.partial.return.wizard.line'
@@ -0,0 +1,26 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+{
+    'name': 'Point of Sale Performance Log',
+    'summary': 'Measure the queries and time of the PoS returns and '
+               'invoice payments',
+    'version': '11.0.1.0.0',
+    'category': 'Point Of Sale',
+    'author': 'Lambda IS, '
+              'Odoo Community Association (OCA)',
+    'license': 'AGPL-3',
+    'website': 'https://www.github.com/OCA/pos',
+    'depends': [
+        'pos_order_return',
+        'pos_session_pay_invoice',
+    ],
+    'data': [
+        'security/ir.model.access.csv',
+        'data/ir_config_parameter.xml',
+        'data/ir_cron.xml',
+        'views/pos_performance_log_view.xml',
+        'views/pos_performance_report_view.xml',
+    ],
+    'installable': True,
+}
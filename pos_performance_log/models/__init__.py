@@ -0,0 +1,8 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from . import pos_performance_log
+from . import pos_performance_report
+from . import cash_invoice
+from . import pos_order
+from . import pos_session_pay_invoices
@@ -0,0 +1,24 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, models
+
+from .pos_performance_log import instrumented
+
+
+class CashInvoiceIn(models.TransientModel):
+    _inherit = 'cash.invoice.in'
+
+    @api.multi
+    @instrumented
+    def run(self):
+        return super(CashInvoiceIn, self).run()
+
+
+class CashInvoiceOut(models.TransientModel):
+    _inherit = 'cash.invoice.out'
+
+    @api.multi
+    @instrumented
+    def run(self):
+        return super(CashInvoiceOut, self).run()
@@ -0,0 +1,49 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, models
+
+from .pos_performance_log import instrumented
+
+
+class PosOrder(models.Model):
+    _inherit = 'pos.order'
+
+    @api.multi
+    @instrumented
+    def refund(self):
+        return super(PosOrder, self).refund()
+
+    @api.multi
+    @instrumented
+    def partial_refund(self, partial_return_wizard):
+        return super(PosOrder, self).partial_refund(partial_return_wizard)
+
+    @api.multi
+    @instrumented
+    def action_pos_order_paid(self):
+        return super(PosOrder, self).action_pos_order_paid()
+
+    @api.multi
+    @instrumented
+    def create_picking(self):
+        return super(PosOrder, self).create_picking()
+
+    @api.multi
+    @instrumented
+    def _action_create_picking_return(self):
+        return super(PosOrder, self)._action_create_picking_return()
+
+    @api.multi
+    @instrumented
+    def _create_grouped_picking_returns(self):
+        return super(PosOrder, self)._create_grouped_picking_returns()
+
+
+class PosOrderLine(models.Model):
+    _inherit = 'pos.order.line'
+
+    @api.constrains('returned_line_id', 'qty')
+    @instrumented
+    def _check_return_qty(self):
+        return super(PosOrderLine, self)._check_return_qty()
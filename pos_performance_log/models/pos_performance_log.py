@@ -0,0 +1,160 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import functools
+import logging
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import str2bool
+
+_logger = logging.getLogger(__name__)
+
+# Path from the instrumented records to their PoS config
+CONFIG_PATHS = {
+    'pos.order': 'session_id.config_id',
+    'pos.order.line': 'order_id.session_id.config_id',
+    'pos.session.pay.invoices': 'session_id.config_id',
+}
+
+
+def instrumented(method):
+    """Log the queries, the time and the records of each call of ``method``
+    when the instrumentation is enabled, including the calls raising an
+    exception. The measures of a call include the ones of the instrumented
+    calls it makes.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        log_obj = self.env['pos.performance.log']
+        if not log_obj._is_enabled():
+            return method(self, *args, **kwargs)
+        cr = self.env.cr
+        query_count = cr.sql_log_count
+        start = time.time()
+        failed = True
+        try:
+            res = method(self, *args, **kwargs)
+            failed = False
+            return res
+        finally:
+            log_obj._log_call(
+                self, method.__name__, cr.sql_log_count - query_count,
+                time.time() - start, failed=failed)
+    return wrapper
+
+
+class PosPerformanceLog(models.Model):
+    _name = 'pos.performance.log'
+    _description = 'PoS Performance Log'
+    _order = 'id desc'
+
+    name = fields.Char(
+        string='Method',
+        required=True,
+        readonly=True,
+    )
+    model = fields.Char(
+        required=True,
+        readonly=True,
+    )
+    config_id = fields.Many2one(
+        comodel_name='pos.config',
+        string='Point of Sale',
+        readonly=True,
+        index=True,
+        ondelete='cascade',
+    )
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='User',
+        readonly=True,
+    )
+    record_count = fields.Integer(
+        string='Records',
+        readonly=True,
+    )
+    query_count = fields.Integer(
+        string='Queries',
+        readonly=True,
+    )
+    duration = fields.Float(
+        string='Duration (ms)',
+        readonly=True,
+    )
+    failed = fields.Boolean(
+        readonly=True,
+        help="The call raised an exception",
+    )
+
+    @api.model
+    def _is_enabled(self):
+        return str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'pos_performance_log.enabled'), False)
+
+    @api.model
+    def _get_config(self, records):
+        """PoS config of the instrumented records, or of the session the
+        wizards are run from"""
+        if records._name in CONFIG_PATHS:
+            return records.mapped(CONFIG_PATHS[records._name])[:1]
+        context = self.env.context
+        if context.get('active_model') == 'pos.session':
+            return self.env['pos.session'].browse(
+                context.get('active_ids') or context.get('active_id')
+            ).mapped('config_id')[:1]
+        return self.env['pos.config']
+
+    @api.model
+    def _prepare_log_values(self, records, method_name, query_count,
+                            duration, failed):
+        return {
+            'name': method_name,
+            'model': records._name,
+            'config_id': self._get_config(records).id,
+            'user_id': self.env.uid,
+            'record_count': len(records),
+            'query_count': query_count,
+            'duration': duration * 1000,
+            'failed': failed,
+        }
+
+    @api.model
+    def _log_call(self, records, method_name, query_count, duration,
+                  failed=False):
+        """Log a call. The failed calls are logged in a new transaction, as
+        the one of the call is rolled back, and never raise so that the
+        exception of the call isn't hidden.
+        """
+        if not failed:
+            values = self._prepare_log_values(
+                records, method_name, query_count, duration, failed)
+            _logger.debug("PoS performance: %s", values)
+            return self.sudo().create(values)
+        try:
+            with self.pool.cursor() as cr:
+                log_obj = self.with_env(self.env(cr=cr))
+                values = log_obj._prepare_log_values(
+                    records.with_env(log_obj.env).exists(), method_name,
+                    query_count, duration, failed)
+                # The records may only exist in the failed transaction
+                values['record_count'] = len(records)
+                _logger.debug("PoS performance: %s", values)
+                return self.browse(log_obj.sudo().create(values).id)
+        except Exception:
+            _logger.warning(
+                "PoS performance: failed call of %s not logged",
+                method_name, exc_info=True)
+            return self.browse()
+
+    @api.model
+    def _gc_logs(self):
+        """Remove the logs older than the retention period, in days"""
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'pos_performance_log.retention_days', 30))
+        self.env.cr.execute(
+            "DELETE FROM pos_performance_log WHERE create_date < %s",
+            (fields.Datetime.to_string(
+                fields.Datetime.from_string(fields.Datetime.now()) -
+                timedelta(days=days)),))
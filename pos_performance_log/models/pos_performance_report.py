@@ -0,0 +1,85 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, fields, models, tools
+
+
+class PosPerformanceReport(models.Model):
+    _name = 'pos.performance.report'
+    _description = 'PoS Performance Report'
+    _auto = False
+    _order = 'date desc'
+
+    date = fields.Date(
+        readonly=True,
+    )
+    config_id = fields.Many2one(
+        comodel_name='pos.config',
+        string='Point of Sale',
+        readonly=True,
+    )
+    name = fields.Char(
+        string='Method',
+        readonly=True,
+    )
+    model = fields.Char(
+        readonly=True,
+    )
+    call_count = fields.Integer(
+        string='Calls',
+        readonly=True,
+    )
+    record_count = fields.Integer(
+        string='Records',
+        readonly=True,
+    )
+    failed_count = fields.Integer(
+        string='Failed Calls',
+        readonly=True,
+    )
+    query_count = fields.Integer(
+        string='Queries',
+        readonly=True,
+    )
+    duration = fields.Float(
+        string='Duration (ms)',
+        readonly=True,
+    )
+    avg_query_count = fields.Float(
+        string='Average Queries',
+        readonly=True,
+        group_operator='avg',
+    )
+    avg_duration = fields.Float(
+        string='Average Duration (ms)',
+        readonly=True,
+        group_operator='avg',
+    )
+    max_duration = fields.Float(
+        string='Maximum Duration (ms)',
+        readonly=True,
+        group_operator='max',
+    )
+
+    @api.model_cr
+    def init(self):
+        tools.drop_view_if_exists(self._cr, self._table)
+        self._cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT
+                    min(l.id) AS id,
+                    l.create_date::date AS date,
+                    l.config_id,
+                    l.name,
+                    l.model,
+                    count(*) AS call_count,
+                    sum(CASE WHEN l.failed THEN 1 ELSE 0 END) AS failed_count,
+                    sum(l.record_count) AS record_count,
+                    sum(l.query_count) AS query_count,
+                    sum(l.duration) AS duration,
+                    avg(l.query_count) AS avg_query_count,
+                    avg(l.duration) AS avg_duration,
+                    max(l.duration) AS max_duration
+                FROM pos_performance_log l
+                GROUP BY l.create_date::date, l.config_id, l.name, l.model
+            )""" % self._table)
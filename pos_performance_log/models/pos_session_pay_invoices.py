@@ -0,0 +1,15 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, models
+
+from .pos_performance_log import instrumented
+
+
+class PosSessionPayInvoices(models.TransientModel):
+    _inherit = 'pos.session.pay.invoices'
+
+    @api.multi
+    @instrumented
+    def run(self):
+        return super(PosSessionPayInvoices, self).run()
@@ -0,0 +1,6 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from . import test_pos_performance_log
+from . import test_pos_order_return_performance
+from . import test_pos_session_pay_invoice_performance
@@ -0,0 +1,52 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from odoo.tests import common
+
+_logger = logging.getLogger(__name__)
+
+
+def bench_param(variable, default):
+    """Size of the generated data, which can be raised with an environment
+    variable to benchmark bigger sessions or orders"""
+    return int(os.environ.get(variable, default))
+
+
+class QueryBudgetCase(common.TransactionCase):
+    """Query counts of a method, measured for a size of the data and for
+    twice this size. The additional queries per additional unit, e.g. per
+    line or per invoice, must stay in the budgets of ``query_budgets``.
+    """
+    # Size of the small measure, the big one is twice bigger
+    bench_size = 1
+    # Unit of the size in the messages, e.g. 'lines'
+    bench_unit = 'records'
+    # Maximum queries per additional unit, by measured method
+    query_budgets = {}
+    # Allowance for the prefetching and caching differences between sizes
+    query_slack = 5
+
+    @contextmanager
+    def _count_queries(self, name, size, result):
+        queries = self.cr.sql_log_count
+        start = time.time()
+        yield
+        result.append(self.cr.sql_log_count - queries)
+        _logger.info(
+            "%s for %d %s: %d queries in %.3fs",
+            name, size, self.bench_unit, result[-1], time.time() - start)
+
+    def _assert_query_budget(self, name, counts):
+        budget = self.query_budgets[name] * self.bench_size + self.query_slack
+        self.assertLessEqual(
+            counts[1] - counts[0], budget,
+            "%s: %d queries for %d %s but %d for %d %s, more than %d queries "
+            "per additional one" % (
+                name, counts[0], self.bench_size, self.bench_unit, counts[1],
+                self.bench_size * 2, self.bench_unit,
+                self.query_budgets[name]))
@@ -0,0 +1,144 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo.tests import common
+
+from .common import QueryBudgetCase, bench_param
+
+
+@common.at_install(False)
+@common.post_install(True)
+class TestPOSOrderReturnPerformance(QueryBudgetCase):
+    """Query counts of the return flow, measured on an order and on an order
+    twice bigger. The additional queries per additional line must stay in
+    the budgets, so that copying and writing each line separately, running
+    a wizard per line, or querying each refund already made fails the tests.
+    """
+    # Lines of the small order, the big one has twice more
+    lines = bench_size = bench_param('POS_RETURN_BENCH_LINES', 10)
+    bench_unit = 'lines'
+    # Products the lines are spread over
+    products = bench_param('POS_RETURN_BENCH_PRODUCTS', 5)
+    # Partial refunds already made on the orders before measuring
+    refund_depth = bench_param('POS_RETURN_BENCH_REFUND_DEPTH', 2)
+
+    # Maximum queries per additional line: the queries each new line costs
+    # by itself, with a margin of one or two queries. A refund line is an
+    # insert and the updates of its stored fields and of the ones of the
+    # returned line. A return move is an insert, the links with the returned
+    # move and its reservation.
+    query_budgets = {
+        'refund': 6,
+        'partial_refund': 6,
+        '_check_return_qty': 0,
+        'create_picking': 15,
+        'wizard_default_get': 0,
+    }
+
+    def setUp(self):
+        super(TestPOSOrderReturnPerformance, self).setUp()
+        self.partner = self.env['res.partner'].create({
+            'name': 'Mr. Benchmark',
+        })
+        self.product_list = [self.env['product.product'].create({
+            'name': 'Benchmark product %d' % index,
+            'standard_price': 1.0,
+            'type': 'product',
+            'pos_allow_negative_qty': True,
+            'taxes_id': False,
+        }) for index in range(self.products)]
+        self.pos_config = self.env.ref('point_of_sale.pos_config_main')
+        self.pos_config.open_session_cb()
+        self.session = self.pos_config.current_session_id
+        self.wizard_obj = self.env['pos.partial.return.wizard']
+
+    def _create_order(self, line_count):
+        """Paid and delivered order, with a quantity per line leaving
+        something to return after the partial refunds of ``_refund_chain``"""
+        order = self.env['pos.order'].create({
+            'session_id': self.session.id,
+            'partner_id': self.partner.id,
+            'pricelist_id': self.partner.property_product_pricelist.id,
+            'lines': [(0, 0, {
+                'name': 'POSLINE/%04d' % index,
+                'product_id': self.product_list[
+                    index % len(self.product_list)].id,
+                'price_unit': 10.0,
+                'qty': self.refund_depth + 2.0,
+            }) for index in range(line_count)],
+        })
+        self.env['pos.make.payment'].with_context(
+            active_ids=order.ids, active_id=order.id,
+        ).create({}).check()
+        return order
+
+    def _refund_chain(self, order):
+        """Return one unit of each line ``refund_depth`` times"""
+        for __ in range(self.refund_depth):
+            wizard = self._create_wizard(order)
+            wizard.line_ids.write({'qty': 1.0})
+            wizard.confirm()
+
+    def _create_wizard(self, order):
+        return self.wizard_obj.with_context(
+            active_ids=order.ids, active_id=order.id).create({})
+
+    def _prepare_orders(self):
+        orders = []
+        for line_count in (self.lines, self.lines * 2):
+            order = self._create_order(line_count)
+            self._refund_chain(order)
+            orders.append(order)
+        # Measure warm calls, not the first loads of the registry
+        self.env.invalidate_all()
+        return orders
+
+    def test_refund_queries(self):
+        counts = []
+        for order in self._prepare_orders():
+            with self._count_queries('refund', len(order.lines), counts):
+                order.refund()
+        self._assert_query_budget('refund', counts)
+
+    def test_partial_refund_queries(self):
+        counts = []
+        for order in self._prepare_orders():
+            wizard = self._create_wizard(order)
+            wizard.line_ids.write({'qty': 1.0})
+            self.env.invalidate_all()
+            with self._count_queries(
+                    'partial_refund', len(order.lines), counts):
+                order.partial_refund(wizard)
+        self._assert_query_budget('partial_refund', counts)
+
+    def test_check_return_qty_queries(self):
+        counts = []
+        for order in self._prepare_orders():
+            refund_lines = order.mapped('refund_order_ids.lines')
+            self.env.invalidate_all()
+            with self._count_queries(
+                    '_check_return_qty', len(order.lines), counts):
+                refund_lines._check_return_qty()
+        self._assert_query_budget('_check_return_qty', counts)
+
+    def test_create_picking_queries(self):
+        counts = []
+        for order in self._prepare_orders():
+            refund_order = self.env['pos.order'].browse(
+                order.refund()['res_id'])
+            self.env.invalidate_all()
+            with self._count_queries(
+                    'create_picking', len(order.lines), counts):
+                refund_order.create_picking()
+            self.assertTrue(refund_order.picking_id)
+        self._assert_query_budget('create_picking', counts)
+
+    def test_wizard_default_get_queries(self):
+        counts = []
+        for order in self._prepare_orders():
+            wizard_obj = self.wizard_obj.with_context(
+                active_ids=order.ids, active_id=order.id)
+            with self._count_queries(
+                    'wizard_default_get', len(order.lines), counts):
+                wizard_obj.default_get(['order_id', 'line_ids'])
+        self._assert_query_budget('wizard_default_get', counts)
@@ -0,0 +1,107 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import SUPERUSER_ID, api
+from odoo.exceptions import UserError
+from odoo.tests import common
+
+
+class TestPosPerformanceLog(common.TransactionCase):
+    def setUp(self):
+        super(TestPosPerformanceLog, self).setUp()
+        self.log_obj = self.env['pos.performance.log']
+        self.pos_config = self.env.ref('point_of_sale.pos_config_main')
+        self.pos_config.open_session_cb()
+        partner = self.env['res.partner'].create({'name': 'Mr. Odoo'})
+        product = self.env['product.product'].create({
+            'name': 'Test product',
+            'type': 'product',
+            'pos_allow_negative_qty': True,
+            'taxes_id': False,
+        })
+        self.pos_order = self.env['pos.order'].create({
+            'session_id': self.pos_config.current_session_id.id,
+            'partner_id': partner.id,
+            'pricelist_id': partner.property_product_pricelist.id,
+            'lines': [(0, 0, {
+                'name': 'POSLINE/0001',
+                'product_id': product.id,
+                'price_unit': 10.0,
+                'qty': 2.0,
+            })],
+        })
+
+    def _enable(self, enabled):
+        self.env['ir.config_parameter'].set_param(
+            'pos_performance_log.enabled', enabled and 'True' or 'False')
+
+    def test_disabled(self):
+        self._enable(False)
+        logs = self.log_obj.search([])
+        self.pos_order.refund()
+        self.assertEqual(self.log_obj.search([]), logs)
+
+    def test_refund_logged(self):
+        self._enable(True)
+        self.pos_order.refund()
+        logs = self.log_obj.search([('config_id', '=', self.pos_config.id)])
+        self.assertEqual(
+            set(logs.mapped('name')), {'refund', '_check_return_qty'})
+        refund_log = logs.filtered(lambda x: x.name == 'refund')
+        self.assertEqual(refund_log.model, 'pos.order')
+        self.assertEqual(refund_log.record_count, 1)
+        self.assertTrue(refund_log.query_count)
+        # The nested checks are included in the refund
+        self.assertGreaterEqual(
+            refund_log.query_count,
+            sum((logs - refund_log).mapped('query_count')))
+        report = self.env['pos.performance.report'].read_group(
+            [('config_id', '=', self.pos_config.id)],
+            ['name', 'call_count', 'query_count'], ['name'])
+        report = dict((x['name'], x) for x in report)
+        self.assertEqual(report['refund']['call_count'], 1)
+        self.assertEqual(
+            report['refund']['query_count'], refund_log.query_count)
+
+    def test_gc_logs(self):
+        self._enable(True)
+        self.pos_order.refund()
+        self.env['ir.config_parameter'].set_param(
+            'pos_performance_log.retention_days', '-1')
+        self.log_obj._gc_logs()
+        self.assertFalse(self.log_obj.search([]))
+
+    def test_picking_return_logged(self):
+        self.env['pos.make.payment'].with_context(
+            active_ids=self.pos_order.ids, active_id=self.pos_order.id,
+        ).create({}).check()
+        refund_order = self.env['pos.order'].browse(
+            self.pos_order.refund()['res_id'])
+        self._enable(True)
+        refund_order.create_picking()
+        log = self.log_obj.search([
+            ('name', '=', '_action_create_picking_return')])
+        self.assertEqual(log.config_id, self.pos_config)
+        self.assertEqual(log.record_count, 1)
+
+    def test_failed_call_logged(self):
+        self.env['pos.make.payment'].with_context(
+            active_ids=self.pos_order.ids, active_id=self.pos_order.id,
+        ).create({}).check()
+        refund_order = self.env['pos.order'].browse(
+            self.pos_order.refund()['res_id'])
+        self.pos_order.picking_id.state = 'assigned'
+        self._enable(True)
+        with self.assertRaises(UserError):
+            refund_order._action_create_picking_return()
+        # The failed call is logged in its own transaction
+        with self.registry.cursor() as cr:
+            log_obj = api.Environment(cr, SUPERUSER_ID, {})[
+                'pos.performance.log']
+            log = log_obj.search([
+                ('name', '=', '_action_create_picking_return'),
+                ('failed', '=', True),
+            ])
+            self.assertEqual(len(log), 1)
+            self.assertEqual(log.record_count, 1)
+            log.unlink()
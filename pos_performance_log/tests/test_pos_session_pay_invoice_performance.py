@@ -0,0 +1,128 @@
+# Copyright 2018 Lambda IS DOOEL <https://www.lambda-is.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo.tests import common
+
+from .common import QueryBudgetCase, bench_param
+
+
+@common.at_install(False)
+@common.post_install(True)
+class TestSessionPayInvoicePerformance(QueryBudgetCase):
+    """Query counts of the invoice payments, measured for a number of
+    invoices and for twice this number. The additional queries per
+    additional invoice must stay in the budgets.
+    """
+    # Invoices of the small batch, the big one has twice more
+    invoices = bench_size = bench_param('POS_PAY_BENCH_INVOICES', 5)
+    bench_unit = 'invoices'
+
+    # Maximum queries per additional invoice: the insert of its statement
+    # line and the read of its receivable move lines, with a margin of two
+    # queries
+    query_budgets = {
+        'cash_invoice_run': 0,
+        'pay_invoices_run': 5,
+        'pay_invoices_from_ui': 5,
+    }
+
+    def setUp(self):
+        super(TestSessionPayInvoicePerformance, self).setUp()
+        self.company = self.env.ref('base.main_company')
+        self.partner = self.env.ref('base.partner_demo')
+        self.account = self.env['account.account'].create({
+            'code': 'test_cash_pay_invoice_bench',
+            'company_id': self.company.id,
+            'name': 'Test',
+            'user_type_id': self.env.ref(
+                'account.data_account_type_revenue').id
+        })
+        config = self.env.ref('point_of_sale.pos_config_main')
+        config.cash_control = True
+        config.open_session_cb()
+        self.session = config.current_session_id
+        self.session.action_pos_session_open()
+        self.journal = self.session.cash_register_id.journal_id
+
+    def _create_invoices(self, count):
+        invoices = self.env['account.invoice']
+        for __ in range(count):
+            invoice = self.env['account.invoice'].create({
+                'company_id': self.company.id,
+                'partner_id': self.partner.id,
+                'date_invoice': '2016-03-12',
+                'type': 'out_invoice',
+                'invoice_line_ids': [(0, 0, {
+                    'product_id': self.env.ref(
+                        'product.product_delivery_02').id,
+                    'account_id': self.account.id,
+                    'name': 'Producto de prueba',
+                    'quantity': 1.0,
+                    'price_unit': 100.0,
+                })],
+            })
+            invoice._onchange_invoice_line_ids()
+            invoice.action_invoice_open()
+            invoices |= invoice
+        return invoices
+
+    def test_cash_invoice_run_queries(self):
+        """Paying an invoice doesn't depend on the lines of the session"""
+        counts = []
+        invoice_obj = self.env['cash.invoice.out'].with_context(
+            active_ids=self.session.ids, active_model='pos.session')
+        for size in (self.invoices, self.invoices * 2):
+            self.env['pos.session.pay.invoices'].with_context(
+                active_id=self.session.id, active_model='pos.session',
+            ).create({
+                'mode': 'collect',
+                'journal_id': self.journal.id,
+                'line_ids': [(0, 0, {
+                    'invoice_id': invoice.id,
+                    'amount': 10.0,
+                }) for invoice in self._create_invoices(
+                    size - len(self.session.cash_register_id.line_ids))],
+            }).run()
+            wizard = invoice_obj.create({
+                'invoice_id': self._create_invoices(1).id,
+                'journal_id': self.journal.id,
+                'amount': 100.0,
+            })
+            self.env.invalidate_all()
+            with self._count_queries('cash_invoice_run', size, counts):
+                wizard.run()
+        self._assert_query_budget('cash_invoice_run', counts)
+
+    def test_pay_invoices_run_queries(self):
+        counts = []
+        for size in (self.invoices, self.invoices * 2):
+            wizard = self.env['pos.session.pay.invoices'].with_context(
+                active_id=self.session.id, active_model='pos.session',
+            ).create({
+                'mode': 'collect',
+                'journal_id': self.journal.id,
+                'line_ids': [(0, 0, {
+                    'invoice_id': invoice.id,
+                    'amount': 100.0,
+                }) for invoice in self._create_invoices(size)],
+            })
+            self.env.invalidate_all()
+            with self._count_queries('pay_invoices_run', size, counts):
+                wizard.run()
+        self._assert_query_budget('pay_invoices_run', counts)
+
+    def test_pay_invoices_from_ui_queries(self):
+        counts = []
+        for size in (self.invoices, self.invoices * 2):
+            payments = [{
+                'uid': '%s-bench-%s' % (self.session.id, invoice.id),
+                'session_id': self.session.id,
+                'journal_id': self.journal.id,
+                'invoice_id': invoice.id,
+                'amount': 100.0,
+                'mode': 'collect',
+            } for invoice in self._create_invoices(size)]
+            self.env.invalidate_all()
+            with self._count_queries('pay_invoices_from_ui', size, counts):
+                self.env['pos.session'].pay_invoices_from_ui(payments)
+        self._assert_query_budget('pay_invoices_from_ui', counts)
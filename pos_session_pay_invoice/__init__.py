@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
 
+from . import models
 from . import wizard
@@ -4,7 +4,7 @@
 
 {
     'name': 'POS Session Pay invoice',
-    'version': '11.0.1.0.0',
+    'version': '11.0.1.1.0',
     'category': 'Point Of Sale',
     'author': "Creu Blanca,"
               "Odoo Community Association (OCA)",
@@ -17,6 +17,12 @@
     'data': [
         "wizard/cash_invoice_out.xml",
         "wizard/cash_invoice_in.xml",
+        "wizard/pos_session_pay_invoices.xml",
         "views/pos_session.xml",
+        "views/pos_config_view.xml",
+        "templates/assets.xml",
+    ],
+    'qweb': [
+        "static/src/xml/pos.xml",
     ],
 }
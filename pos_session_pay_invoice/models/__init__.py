@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+from . import account_bank_statement_line
+from . import account_invoice
+from . import pos_config
+from . import pos_session
+from . import res_partner
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+from odoo import fields, models
+
+
+class AccountBankStatementLine(models.Model):
+    _inherit = 'account.bank.statement.line'
+
+    pos_payment_uid = fields.Char(
+        string='PoS Payment Reference',
+        readonly=True,
+        copy=False,
+        help="Reference given by the PoS to the invoice payment, so that it "
+             "is registered once even when it is synchronized again.",
+    )
+
+    _sql_constraints = [
+        ('pos_payment_uid_uniq', 'unique(pos_payment_uid)',
+         'This PoS invoice payment is already registered.'),
+    ]
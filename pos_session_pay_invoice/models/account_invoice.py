@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+from odoo import api, models, _
+from odoo.exceptions import UserError
+from odoo.tools.sql import create_index, index_exists
+
+# Invoice types paid or collected from a PoS session
+POS_INVOICE_TYPES = {
+    'pay': ('in_invoice', 'out_refund'),
+    'collect': ('out_invoice', 'in_refund'),
+}
+# account_cash_invoice wizard computing the statement lines of each mode
+POS_INVOICE_WIZARDS = {
+    'pay': 'cash.invoice.in',
+    'collect': 'cash.invoice.out',
+}
+
+
+class AccountInvoice(models.Model):
+    _inherit = 'account.invoice'
+
+    @api.model_cr
+    def init(self):
+        # Lookups of _search_pos_invoices: number prefixes and partners
+        for name, expressions in [
+                ('account_invoice_number_prefix_index',
+                 ['upper(number) text_pattern_ops']),
+                ('account_invoice_commercial_partner_id_index',
+                 ['commercial_partner_id']),
+                ('account_invoice_partner_id_index', ['partner_id'])]:
+            if not index_exists(self._cr, name):
+                create_index(self._cr, name, self._table, expressions)
+
+    @api.model
+    def _get_pos_invoice_company(self):
+        """Company of the open PoS session of the user, or of the user"""
+        session = self.env['pos.session'].search([
+            ('state', '=', 'opened'),
+            ('user_id', '=', self.env.uid),
+        ], limit=1)
+        return session.config_id.company_id or self.env.user.company_id
+
+    @api.model
+    def _search_pos_invoices(self, term, mode, limit=20):
+        """Open invoices to pay or collect from a PoS, whose number or
+        partner name start with ``term``, or whose number or partner barcode
+        is ``term``.
+
+        The lookup is a single query relying on the prefix indexes of the
+        invoice number and of the partner name, without the ORM overhead
+        of a generic ``ilike`` search on all the open invoices. Only the
+        invoices of the company of the PoS session of the user are looked
+        up, and the record rules are applied on the result.
+
+        :param mode: 'pay' or 'collect', see POS_INVOICE_TYPES
+        :return: list of dicts {'id', 'number', 'partner_id', 'partner_name',
+            'date_due', 'residual', 'currency_id', 'type'}
+        """
+        self.check_access_rights('read')
+        company_id = self._get_pos_invoice_company().id
+        term = (term or '').strip()
+        prefix = term.upper().replace('\\', '\\\\').replace(
+            '%', '\\%').replace('_', '\\_') + '%'
+        # The partners found match the invoices made out to them, and the
+        # invoices of their contacts when they are companies
+        self._cr.execute("""
+            WITH partners AS (
+                SELECT id FROM res_partner
+                WHERE upper(name) LIKE %(prefix)s OR barcode = %(term)s
+            )
+            SELECT i.id, i.number, i.partner_id, p.name, i.date_due,
+                i.residual, i.currency_id, i.type
+            FROM account_invoice i
+            JOIN res_partner p ON p.id = i.partner_id
+            WHERE i.state = 'open'
+                AND i.type IN %(types)s
+                AND i.company_id = %(company_id)s
+                AND (
+                    upper(i.number) LIKE %(prefix)s
+                    OR i.partner_id IN (SELECT id FROM partners)
+                    OR i.commercial_partner_id IN (SELECT id FROM partners)
+                )
+            ORDER BY i.date_due, i.id
+            LIMIT %(limit)s
+        """, {
+            'types': POS_INVOICE_TYPES[mode],
+            'company_id': company_id,
+            'prefix': prefix,
+            'term': term,
+            'limit': limit,
+        })
+        rows = self._cr.fetchall()
+        # The query bypasses the record rules, applied on its result
+        allowed_ids = set(self.search([
+            ('id', 'in', [row[0] for row in rows])]).ids)
+        return [{
+            'id': row[0],
+            'number': row[1],
+            'partner_id': row[2],
+            'partner_name': row[3],
+            'date_due': row[4],
+            'residual': row[5],
+            'currency_id': row[6],
+            'type': row[7],
+        } for row in rows if row[0] in allowed_ids]
+
+    @api.model
+    def search_pos_invoices(self, term, mode='collect', limit=20):
+        """Invoice picker of the PoS, see ``_search_pos_invoices``"""
+        return self._search_pos_invoices(term, mode, limit=limit)
+
+    @api.multi
+    def _prepare_pos_statement_line_values(self, statement, amount, mode):
+        """Statement line paying or collecting the invoice, computed by the
+        wizards of account_cash_invoice so that it is reconciled the same
+        way.
+
+        :param mode: 'pay' or 'collect', see POS_INVOICE_TYPES
+        """
+        self.ensure_one()
+        if self.state != 'open' or self.type not in POS_INVOICE_TYPES[mode]:
+            raise UserError(_(
+                "Invoice %s can't be settled this way, it should be an "
+                "open invoice of one of these types: %s.") % (
+                self.number, ', '.join(POS_INVOICE_TYPES[mode])))
+        return self.env[POS_INVOICE_WIZARDS[mode]].new({
+            'name': self.number,
+            'invoice_id': self.id,
+            'amount': amount,
+            'journal_id': statement.journal_id.id,
+            'company_id': self.company_id.id,
+            'currency_id': self.currency_id.id,
+        })._calculate_values_for_statement_line(statement)
+
+    @api.model
+    def name_search(self, name, args=None, operator='ilike', limit=100):
+        mode = self.env.context.get('pos_invoice_search')
+        if mode in POS_INVOICE_TYPES and name and operator == 'ilike':
+            invoices = self.browse([
+                invoice['id'] for invoice in self._search_pos_invoices(
+                    name, mode, limit=limit)])
+            if args:
+                invoices = self.search(
+                    [('id', 'in', invoices.ids)] + list(args))
+            return invoices.name_get()
+        return super(AccountInvoice, self).name_search(
+            name, args=args, operator=operator, limit=limit)
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+from odoo import fields, models
+
+
+class PosConfig(models.Model):
+    _inherit = 'pos.config'
+
+    iface_pay_invoices = fields.Boolean(
+        string='Pay Invoices',
+        help="Pay and collect invoices from the PoS, in cash.",
+    )
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import logging
+from collections import OrderedDict
+
+import psycopg2
+
+from odoo import api, models, tools, _
+from odoo.exceptions import UserError, except_orm
+
+_logger = logging.getLogger(__name__)
+
+
+class PosSession(models.Model):
+    _inherit = 'pos.session'
+
+    @api.multi
+    def _get_journal_statements(self, journal):
+        """Statements of the sessions for a journal, found with a single
+        search.
+
+        :raise UserError: if a session has no open statement for the journal
+        """
+        statements = self.env['account.bank.statement'].search([
+            ('pos_session_id', 'in', self.ids),
+            ('journal_id', '=', journal.id),
+        ])
+        missing = self - statements.mapped('pos_session_id')
+        if missing:
+            raise UserError(_(
+                'Bank Statement was not found for the sessions: %s'
+            ) % ', '.join(missing.mapped('name')))
+        closed = statements.filtered(lambda r: r.state == 'confirm')
+        if closed:
+            raise UserError(_(
+                "You cannot put/take money in/out for a bank statement "
+                "which is closed: %s") % ', '.join(closed.mapped('name')))
+        return statements
+
+    @api.multi
+    def _check_invoice_payment_session(self):
+        """Invoices are paid from the PoS in an open session of the user
+
+        :raise UserError: otherwise
+        """
+        self.ensure_one()
+        if not self.exists() or self.state != 'opened' or \
+                self.user_id.id != self.env.uid:
+            raise UserError(_(
+                "Invoice payments can only be registered in an open session "
+                "of the current user."))
+
+    @api.model
+    def _get_invoice_payment_error(self, error):
+        """Message of an error refusing an invoice payment"""
+        return getattr(error, 'name', None) or tools.ustr(error)
+
+    @api.model
+    def pay_invoices_from_ui(self, payments):
+        """Register the invoice payments made in the PoS, with a single write
+        of the statement lines of each session statement.
+
+        Payments already registered are recognized by their uid and skipped,
+        so that the PoS can send them again until it knows they are synced.
+        A payment failing is refused without preventing the others to be
+        registered: when the write of a statement fails, its payments are
+        registered again one by one, each one in its own savepoint.
+
+        :param payments: list of dicts {'uid', 'session_id', 'journal_id',
+            'invoice_id', 'amount', 'mode'}
+        :return: dict with the uids of the registered payments in 'done' and
+            the errors of the refused ones, by uid, in 'errors'. Payments
+            of a session that isn't an open session of the user are
+            refused.
+        """
+        done = set(self.env['account.bank.statement.line'].search([
+            ('pos_payment_uid', 'in', [x['uid'] for x in payments]),
+        ]).mapped('pos_payment_uid'))
+        # Prefetch the invoices
+        self.env['account.invoice'].browse(
+            [x['invoice_id'] for x in payments]).exists().mapped('residual')
+        statements = {}
+        statement_lines = OrderedDict()
+        errors = {}
+        for payment in payments:
+            if payment['uid'] in done:
+                continue
+            try:
+                key = (payment['session_id'], payment['journal_id'])
+                if key not in statements:
+                    session = self.browse(payment['session_id'])
+                    session._check_invoice_payment_session()
+                    statements[key] = session._get_journal_statements(
+                        self.env['account.journal'].browse(
+                            payment['journal_id']))
+                values = self.env['account.invoice'].browse(
+                    payment['invoice_id'])._prepare_pos_statement_line_values(
+                    statements[key], payment['amount'], payment['mode'])
+            except except_orm as error:
+                errors[payment['uid']] = self._get_invoice_payment_error(
+                    error)
+                continue
+            values['pos_payment_uid'] = payment['uid']
+            statement_lines.setdefault(statements[key], []).append(values)
+            done.add(payment['uid'])
+        for statement, lines in statement_lines.items():
+            try:
+                with self.env.cr.savepoint():
+                    statement.write({
+                        'line_ids': [(0, 0, values) for values in lines],
+                    })
+                continue
+            except (except_orm, psycopg2.Error):
+                _logger.info(
+                    'PoS invoice payments: write of %s failed, registering '
+                    'its payments one by one', statement.name, exc_info=True)
+                self.env.invalidate_all()
+            for values in lines:
+                try:
+                    with self.env.cr.savepoint():
+                        statement.write({'line_ids': [(0, 0, values)]})
+                except (except_orm, psycopg2.Error) as error:
+                    self.env.invalidate_all()
+                    done.discard(values['pos_payment_uid'])
+                    errors[values['pos_payment_uid']] = \
+                        self._get_invoice_payment_error(error)
+        return {'done': list(done), 'errors': errors}
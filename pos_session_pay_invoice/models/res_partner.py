@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+from odoo import api, models
+from odoo.tools.sql import create_index, index_exists
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    @api.model_cr
+    def init(self):
+        # Partner lookups of the PoS invoice picker, see
+        # account.invoice _search_pos_invoices
+        for name, expressions in [
+                ('res_partner_name_prefix_index',
+                 ['upper(name) text_pattern_ops']),
+                ('res_partner_barcode_index', ['barcode'])]:
+            if not index_exists(self._cr, name):
+                create_index(self._cr, name, self._table, expressions)
@@ -0,0 +1,155 @@
+/* License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html). */
+
+odoo.define("pos_session_pay_invoice.models", function (require) {
+    "use strict";
+
+    var core = require("web.core");
+    var models = require("point_of_sale.models");
+    var rpc = require("web.rpc");
+
+    var _t = core._t;
+
+    var _posmodel_super = models.PosModel.prototype;
+    models.PosModel = models.PosModel.extend({
+        // Invoices are paid and collected in cash
+        get_invoice_payment_cashregister: function () {
+            return _.find(this.cashregisters, function (cashregister) {
+                return cashregister.journal.type === "cash";
+            });
+        },
+        search_invoices: function (term, mode) {
+            return rpc.query({
+                model: "account.invoice",
+                method: "search_pos_invoices",
+                args: [term, mode],
+            }, {
+                timeout: 7500,
+                shadow: true,
+            });
+        },
+        get_invoice_payments: function () {
+            return this.db.load("invoice_payments", []);
+        },
+        // The cash of the payments refused by the server has changed hands
+        // already, so they are kept until someone handles them
+        get_refused_invoice_payments: function () {
+            return this.db.load("invoice_payments_refused", []);
+        },
+        /**
+         * Store an invoice payment in the browser, like the orders, so that
+         * it isn't lost while offline, and try to sync it.
+         *
+         * @param {Object} invoice as given by search_invoices
+         * @param {Number} amount
+         * @param {String} mode 'pay' or 'collect'
+         * @returns {Deferred}
+         */
+        add_invoice_payment: function (invoice, amount, mode) {
+            var payments = this.get_invoice_payments();
+            payments.push({
+                uid: _.str.sprintf(
+                    "%s-%s-%s", this.pos_session.id,
+                    this.pos_session.login_number, new Date().getTime()),
+                session_id: this.pos_session.id,
+                journal_id: this.get_invoice_payment_cashregister()
+                    .journal_id[0],
+                invoice_id: invoice.id,
+                invoice_number: invoice.number,
+                partner_name: invoice.partner_name,
+                amount: amount,
+                mode: mode,
+            });
+            this.db.save("invoice_payments", payments);
+            return this.push_invoice_payments();
+        },
+        // Send all the pending invoice payments at once. The server skips
+        // the ones already registered, so they can be sent again until the
+        // answer is received.
+        push_invoice_payments: function () {
+            var self = this;
+            var payments = this.get_invoice_payments();
+            if (this.invoice_payments_push) {
+                return this.invoice_payments_push;
+            }
+            if (!payments.length) {
+                return $.when();
+            }
+            this.invoice_payments_push = rpc.query({
+                model: "pos.session",
+                method: "pay_invoices_from_ui",
+                args: [payments],
+            }, {
+                timeout: 30000,
+                shadow: true,
+            }).then(function (result) {
+                var pending = self.get_invoice_payments();
+                var refused = self.get_refused_invoice_payments();
+                _.each(pending, function (payment) {
+                    if (_.has(result.errors, payment.uid)) {
+                        refused.push(_.extend({}, payment, {
+                            error: result.errors[payment.uid],
+                        }));
+                    }
+                });
+                self.db.save("invoice_payments_refused", refused);
+                self.db.save("invoice_payments", _.reject(
+                    pending, function (payment) {
+                        return _.contains(result.done, payment.uid) ||
+                            _.has(result.errors, payment.uid);
+                    }));
+                if (!_.isEmpty(result.errors)) {
+                    self.gui.show_popup("error", {
+                        title: _t("Invoice Payments Refused"),
+                        body: _.values(result.errors).join("\n") + "\n" +
+                            _t("They are kept in the Invoices screen until " +
+                               "they are handled."),
+                    });
+                }
+                return result;
+            }).always(function () {
+                self.invoice_payments_push = false;
+            });
+            return this.invoice_payments_push;
+        },
+        /**
+         * Send a refused invoice payment again, registered in the current
+         * session.
+         *
+         * @param {String} uid
+         * @returns {Deferred}
+         */
+        retry_invoice_payment: function (uid) {
+            var refused = this.get_refused_invoice_payments();
+            var payment = _.findWhere(refused, {uid: uid});
+            if (!payment) {
+                return $.when();
+            }
+            var payments = this.get_invoice_payments();
+            payments.push(_.extend(_.omit(payment, "error"), {
+                session_id: this.pos_session.id,
+                journal_id: this.get_invoice_payment_cashregister()
+                    .journal_id[0],
+            }));
+            this.db.save("invoice_payments", payments);
+            this.db.save("invoice_payments_refused", _.without(
+                refused, payment));
+            return this.push_invoice_payments();
+        },
+        // The refused payment was handled in the backend
+        dismiss_invoice_payment: function (uid) {
+            this.db.save("invoice_payments_refused", _.reject(
+                this.get_refused_invoice_payments(), function (payment) {
+                    return payment.uid === uid;
+                }));
+        },
+        // Pending invoice payments are synced along with the orders
+        push_order: function () {
+            var self = this;
+            return _posmodel_super.push_order.apply(this, arguments).always(
+                function () {
+                    self.push_invoice_payments();
+                });
+        },
+    });
+
+});
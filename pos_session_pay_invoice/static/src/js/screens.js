@@ -0,0 +1,175 @@
+/* License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html). */
+
+odoo.define("pos_session_pay_invoice.screens", function (require) {
+    "use strict";
+
+    var core = require("web.core");
+    var gui = require("point_of_sale.gui");
+    var screens = require("point_of_sale.screens");
+
+    var QWeb = core.qweb;
+    var _t = core._t;
+
+    var PayInvoiceScreenWidget = screens.ScreenWidget.extend({
+        template: "PayInvoiceScreenWidget",
+
+        show: function () {
+            this._super();
+            this.invoices = [];
+            this.set_mode("collect");
+            this.$("input.pay-invoice-search").val("").focus();
+        },
+        renderElement: function () {
+            var self = this;
+            this._super();
+            this.$(".back").click(function () {
+                self.gui.back();
+            });
+            this.$(".pay-invoice-mode").click(function () {
+                self.set_mode($(this).data("mode"));
+                self.search(self.$("input.pay-invoice-search").val().trim());
+            });
+            this.$("input.pay-invoice-search").on("keypress", function (ev) {
+                if (ev.which === 13) {
+                    self.search($(this).val().trim());
+                }
+            });
+            this.$(".pay-invoice-lines").on(
+                "click", "tr.pay-invoice-line", function () {
+                    self.pay_invoice($(this).data("id"));
+                });
+            this.$(".pay-invoice-lines").on(
+                "click", ".pay-invoice-retry", function () {
+                    self.pos.retry_invoice_payment(
+                        String($(this).data("uid"))).always(function () {
+                        self.render_invoices();
+                    });
+                });
+            this.$(".pay-invoice-lines").on(
+                "click", ".pay-invoice-dismiss", function () {
+                    self.dismiss_payment(String($(this).data("uid")));
+                });
+        },
+        // Invoice numbers aren't known by the barcode nomenclature, and
+        // partner barcodes look their invoices up instead of setting the
+        // customer of the order
+        barcode_error_action: function (code) {
+            this.$("input.pay-invoice-search").val(code.code);
+            this.search(code.code);
+        },
+        barcode_client_action: function (code) {
+            this.barcode_error_action(code);
+            return true;
+        },
+        set_mode: function (mode) {
+            this.mode = mode;
+            this.invoices = [];
+            this.$(".pay-invoice-mode").each(function () {
+                $(this).toggleClass("highlight", $(this).data("mode") === mode);
+            });
+            this.render_invoices();
+        },
+        search: function (term) {
+            var self = this;
+            if (!term) {
+                return;
+            }
+            this.pos.search_invoices(term, this.mode).then(function (invoices) {
+                self.invoices = invoices;
+                self.render_invoices();
+            }, function (error, event) {
+                if (event) {
+                    event.preventDefault();
+                }
+                self.gui.show_popup("error", {
+                    title: _t("Network Error"),
+                    body: _t("Invoices can only be looked up while online. " +
+                             "The payments are kept until they are synced."),
+                });
+            });
+        },
+        render_invoices: function () {
+            this.$(".pay-invoice-lines").html(QWeb.render("PayInvoiceLines", {
+                widget: this,
+                invoices: this.invoices,
+                refused_payments: this.pos.get_refused_invoice_payments(),
+            }));
+        },
+        dismiss_payment: function (uid) {
+            var self = this;
+            this.gui.show_popup("confirm", {
+                title: _t("Dismiss the Refused Payment"),
+                body: _t("The payment will be removed from this PoS. " +
+                         "Dismiss it only once it was registered in the " +
+                         "backend."),
+                confirm: function () {
+                    self.pos.dismiss_invoice_payment(uid);
+                    self.render_invoices();
+                },
+            });
+        },
+        pay_invoice: function (invoice_id) {
+            var self = this;
+            var invoice = _.findWhere(this.invoices, {id: invoice_id});
+            if (!invoice) {
+                return;
+            }
+            if (!this.pos.get_invoice_payment_cashregister()) {
+                this.gui.show_popup("error", {
+                    title: _t("No Cash Register"),
+                    body: _t("Invoices are paid and collected in cash, " +
+                             "which isn't a payment method of this PoS."),
+                });
+                return;
+            }
+            this.gui.show_popup("number", {
+                title: _.str.sprintf(
+                    this.mode === "pay" ? _t("Pay %s") : _t("Collect %s"),
+                    invoice.number),
+                value: invoice.residual,
+                confirm: function (value) {
+                    var amount = parseFloat(value) || 0;
+                    if (amount <= 0 || amount > invoice.residual) {
+                        self.gui.show_popup("error", {
+                            title: _t("Wrong Amount"),
+                            body: _t("The amount must be positive and at " +
+                                     "most the invoice residual."),
+                        });
+                        return;
+                    }
+                    // Not reconciled before the session is closed
+                    invoice.residual -= amount;
+                    self.render_invoices();
+                    self.pos.add_invoice_payment(
+                        invoice, amount, self.mode).always(function () {
+                        self.render_invoices();
+                    });
+                },
+            });
+        },
+    });
+    gui.define_screen({
+        name: "pay_invoice",
+        widget: PayInvoiceScreenWidget,
+    });
+
+    var PayInvoiceButton = screens.ActionButtonWidget.extend({
+        template: "PayInvoiceButton",
+        button_click: function () {
+            this.gui.show_screen("pay_invoice");
+        },
+    });
+    screens.define_action_button({
+        name: "pay_invoice",
+        widget: PayInvoiceButton,
+        condition: function () {
+            return this.pos.config.iface_pay_invoices;
+        },
+    });
+
+    return {
+        PayInvoiceScreenWidget: PayInvoiceScreenWidget,
+        PayInvoiceButton: PayInvoiceButton,
+    };
+
+});
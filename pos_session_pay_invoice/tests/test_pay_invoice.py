@@ -2,6 +2,7 @@
 # Copyright 2017 Creu Blanca <https://creublanca.es/>
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
 
+from odoo.exceptions import UserError
 from odoo.tests import common
 
 
@@ -99,3 +100,167 @@ class TestSessionPayInvoice(common.TransactionCase):
         session.action_pos_session_validate()
         self.assertEqual(self.invoice_out.residual, 25.)
         self.assertEqual(self.invoice_in.residual, 0.)
+
+    def test_pos_invoices_bulk(self):
+        self.config.open_session_cb()
+        session = self.config.current_session_id
+        journal = session.cash_register_id.journal_id
+        journal.profit_account_id = self.account_cash_differences_id
+        journal.loss_account_id = self.account_cash_differences_id
+        session.action_pos_session_open()
+        invoice_out_2 = self.invoice_out.copy()
+        invoice_out_2.action_invoice_open()
+        collect = self.env['pos.session.pay.invoices'].with_context(
+            active_id=session.id, active_model='pos.session'
+        ).create({
+            'mode': 'collect',
+            'journal_id': journal.id,
+            'line_ids': [
+                (0, 0, {'invoice_id': self.invoice_out.id, 'amount': 75.0}),
+                (0, 0, {'invoice_id': invoice_out_2.id, 'amount': 100.0}),
+            ],
+        })
+        self.assertEqual(collect.session_id, session)
+        collect.run()
+        pay = self.env['pos.session.pay.invoices'].with_context(
+            active_id=session.id, active_model='pos.session'
+        ).create({
+            'mode': 'pay',
+            'journal_id': journal.id,
+            'line_ids': [
+                (0, 0, {'invoice_id': self.invoice_in.id, 'amount': 100.0}),
+            ],
+        })
+        pay.run()
+        statement_lines = session.cash_register_id.line_ids
+        self.assertEqual(
+            statement_lines.mapped('invoice_id'),
+            self.invoice_out | invoice_out_2 | self.invoice_in)
+        self.assertEqual(sum(statement_lines.mapped('amount')), 75.0)
+        # An invoice can't be settled the other way round
+        wrong = self.env['pos.session.pay.invoices'].with_context(
+            active_id=session.id, active_model='pos.session'
+        ).create({
+            'mode': 'pay',
+            'journal_id': journal.id,
+            'line_ids': [
+                (0, 0, {'invoice_id': self.invoice_out.id, 'amount': 25.0}),
+            ],
+        })
+        with self.assertRaises(UserError):
+            wrong.run()
+        session.action_pos_session_closing_control()
+        session.action_pos_session_validate()
+        self.assertEqual(self.invoice_out.residual, 25.)
+        self.assertEqual(invoice_out_2.residual, 0.)
+        self.assertEqual(self.invoice_in.residual, 0.)
+
+    def test_pos_invoice_missing_statement(self):
+        self.config.open_session_cb()
+        session = self.config.current_session_id
+        journal = self.env['account.journal'].search([
+            ('type', '=', 'cash'),
+            ('company_id', '=', self.company.id),
+            ('id', 'not in', session.statement_ids.mapped('journal_id').ids),
+        ], limit=1)
+        if not journal:
+            journal = session.cash_register_id.journal_id.copy({
+                'code': 'TPIC'})
+        out_invoice = self.env['cash.invoice.out'].with_context(
+            active_ids=session.ids, active_model='pos.session'
+        ).create({
+            'invoice_id': self.invoice_out.id,
+            'journal_id': journal.id,
+            'amount': 75.0
+        })
+        with self.assertRaises(UserError):
+            out_invoice.run()
+        self.assertFalse(session.statement_ids.mapped('line_ids'))
+
+    def test_search_pos_invoices(self):
+        invoice_obj = self.env['account.invoice']
+        invoices = invoice_obj.search_pos_invoices('2999/', mode='collect')
+        self.assertEqual([x['id'] for x in invoices], self.invoice_out.ids)
+        self.assertEqual(invoices[0]['residual'], 100.0)
+        invoices = invoice_obj.search_pos_invoices('2999/', mode='pay')
+        self.assertEqual([x['id'] for x in invoices], self.invoice_in.ids)
+        partner_name = self.invoice_out.partner_id.name
+        invoices = invoice_obj.search_pos_invoices(
+            partner_name[:3].lower(), mode='collect', limit=1000)
+        self.assertIn(self.invoice_out.id, [x['id'] for x in invoices])
+        self.assertFalse(
+            invoice_obj.search_pos_invoices('%', mode='collect'))
+        # Invoice made out to a contact, found by the contact name
+        company = self.env['res.partner'].create({
+            'name': 'Zqx Company', 'is_company': True})
+        contact = self.env['res.partner'].create({
+            'name': 'Zqy Contact', 'parent_id': company.id})
+        self.invoice_out.partner_id = contact
+        invoices = invoice_obj.search_pos_invoices('ZQY', mode='collect')
+        self.assertEqual([x['id'] for x in invoices], self.invoice_out.ids)
+        invoices = invoice_obj.search_pos_invoices('ZQX', mode='collect')
+        self.assertEqual([x['id'] for x in invoices], self.invoice_out.ids)
+        names = invoice_obj.with_context(
+            pos_invoice_search='collect').name_search('2999/')
+        self.assertEqual([x[0] for x in names], self.invoice_out.ids)
+
+    def test_pos_invoice_from_ui(self):
+        self.config.open_session_cb()
+        session = self.config.current_session_id
+        journal = session.cash_register_id.journal_id
+        journal.profit_account_id = self.account_cash_differences_id
+        journal.loss_account_id = self.account_cash_differences_id
+        session.action_pos_session_open()
+        payments = [{
+            'uid': '%s-1-1' % session.id,
+            'session_id': session.id,
+            'journal_id': journal.id,
+            'invoice_id': self.invoice_out.id,
+            'amount': 75.0,
+            'mode': 'collect',
+        }, {
+            'uid': '%s-1-2' % session.id,
+            'session_id': session.id,
+            'journal_id': journal.id,
+            'invoice_id': self.invoice_in.id,
+            'amount': 100.0,
+            'mode': 'pay',
+        }, {
+            'uid': '%s-1-3' % session.id,
+            'session_id': session.id,
+            'journal_id': journal.id,
+            'invoice_id': self.invoice_in.id,
+            'amount': 100.0,
+            'mode': 'collect',
+        }]
+        session_obj = self.env['pos.session']
+        result = session_obj.pay_invoices_from_ui(payments)
+        self.assertEqual(
+            set(result['done']), {payments[0]['uid'], payments[1]['uid']})
+        self.assertEqual(list(result['errors']), [payments[2]['uid']])
+        # Sending them again doesn't register them twice
+        result = session_obj.pay_invoices_from_ui(payments[:2])
+        self.assertEqual(len(result['done']), 2)
+        self.assertEqual(len(session.cash_register_id.line_ids), 2)
+        # A payment failing doesn't prevent the others to be registered
+        missing_invoice = self.invoice_out.copy()
+        missing_payment = dict(
+            payments[0], uid='%s-1-5' % session.id,
+            invoice_id=missing_invoice.id)
+        missing_invoice.unlink()
+        result = session_obj.pay_invoices_from_ui(
+            payments[:2] + [missing_payment])
+        self.assertEqual(len(result['done']), 2)
+        self.assertEqual(list(result['errors']), [missing_payment['uid']])
+        self.assertEqual(len(session.cash_register_id.line_ids), 2)
+        # Only the open sessions of the user can be paid in
+        other_payment = dict(payments[0], uid='%s-1-4' % session.id)
+        session.user_id = self.env.ref('base.user_demo')
+        result = session_obj.pay_invoices_from_ui([other_payment])
+        self.assertEqual(list(result['errors']), [other_payment['uid']])
+        self.assertEqual(len(session.cash_register_id.line_ids), 2)
+        session.user_id = self.env.user
+        session.action_pos_session_closing_control()
+        session.action_pos_session_validate()
+        self.assertEqual(self.invoice_out.residual, 25.)
+        self.assertEqual(self.invoice_in.residual, 0.)
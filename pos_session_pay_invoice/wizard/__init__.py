@@ -3,3 +3,4 @@
 
 from . import cash_invoice_in
 from . import cash_invoice_out
+from . import pos_session_pay_invoices
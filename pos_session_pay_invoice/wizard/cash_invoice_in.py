@@ -20,11 +20,11 @@ class CashInvoiceIn(models.TransientModel):
     def default_journals(self, active_model, active_ids):
         if active_model == 'pos.session':
             active = self.env[active_model].browse(active_ids)
-            if not active.cash_register_id:
+            if not all(session.cash_register_id for session in active):
                 raise UserError(_(
                     "There is no cash register for this Pos session"
                 ))
-            return active.cash_register_id.journal_id
+            return active.mapped('cash_register_id.journal_id')
         return super(CashInvoiceIn, self).default_journals(
             active_model, active_ids
         )
@@ -43,14 +43,8 @@ class CashInvoiceIn(models.TransientModel):
         active_model = self.env.context.get('active_model', False)
         active_ids = self.env.context.get('active_ids', False)
         if active_model == 'pos.session':
-            bank_statements = [
-                session.statement_ids.filtered(
-                    lambda r: r.journal_id.id == self.journal_id.id
-                )
-                for session in self.env[active_model].browse(active_ids)
-            ]
-            if not bank_statements:
-                raise UserError(_('Bank Statement was not found'))
+            bank_statements = self.env[active_model].browse(
+                active_ids)._get_journal_statements(self.journal_id)
             return self._run(bank_statements)
         else:
             return super(CashInvoiceIn, self).run()
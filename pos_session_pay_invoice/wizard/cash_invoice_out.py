@@ -2,8 +2,7 @@
 # Copyright (C) 2017 Creu Blanca
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
 
-from odoo import api, models, _
-from odoo.exceptions import UserError
+from odoo import api, models
 
 
 class CashInvoiceOut(models.TransientModel):
@@ -29,8 +28,7 @@ class CashInvoiceOut(models.TransientModel):
     def default_journals(self, active_model, active_ids):
         if active_model == 'pos.session':
             active = self.env[active_model].browse(active_ids)
-            return self.env['account.journal'].browse(
-                [r.journal_id.id for r in active.statement_ids])
+            return active.mapped('statement_ids.journal_id')
         return super(CashInvoiceOut, self).default_journals(
             active_model, active_ids
         )
@@ -40,14 +38,8 @@ class CashInvoiceOut(models.TransientModel):
         active_model = self.env.context.get('active_model', False)
         active_ids = self.env.context.get('active_ids', False)
         if active_model == 'pos.session':
-            bank_statements = [
-                session.statement_ids.filtered(
-                    lambda r: r.journal_id.id == self.journal_id.id
-                )
-                for session in self.env[active_model].browse(active_ids)
-            ]
-            if not bank_statements:
-                raise UserError(_('Bank Statement was not found'))
+            bank_statements = self.env[active_model].browse(
+                active_ids)._get_journal_statements(self.journal_id)
             return self._run(bank_statements)
         else:
             return super(CashInvoiceOut, self).run()
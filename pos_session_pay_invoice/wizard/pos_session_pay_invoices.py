@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+from ..models.account_invoice import POS_INVOICE_TYPES
+
+
+class PosSessionPayInvoices(models.TransientModel):
+    _name = 'pos.session.pay.invoices'
+    _description = 'Pay or collect several invoices from a PoS session'
+
+    def _default_session(self):
+        if self.env.context.get('active_model') == 'pos.session':
+            return self.env['pos.session'].browse(
+                self.env.context.get('active_id'))
+        return self.env['pos.session']
+
+    session_id = fields.Many2one(
+        comodel_name='pos.session',
+        string='Session',
+        required=True,
+        readonly=True,
+        default=_default_session,
+    )
+    mode = fields.Selection(
+        selection=[
+            ('pay', 'Pay Supplier Invoices / Customer Refunds'),
+            ('collect', 'Collect Customer Invoices / Supplier Refunds'),
+        ],
+        required=True,
+        default='collect',
+    )
+    journal_ids = fields.Many2many(
+        comodel_name='account.journal',
+        compute='_compute_journal_ids',
+    )
+    journal_id = fields.Many2one(
+        comodel_name='account.journal',
+        string='Journal',
+        required=True,
+        domain="[('id', 'in', journal_ids)]",
+    )
+    partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Partner',
+        help="Propose all the open invoices of this partner",
+    )
+    line_ids = fields.One2many(
+        comodel_name='pos.session.pay.invoices.line',
+        inverse_name='wizard_id',
+        string='Invoices',
+    )
+
+    @api.depends('session_id', 'mode')
+    def _compute_journal_ids(self):
+        for wizard in self:
+            journals = wizard.session_id.statement_ids.mapped('journal_id')
+            if wizard.mode == 'pay':
+                # Invoices are paid with cash only
+                journals = journals.filtered(lambda r: r.type == 'cash')
+            wizard.journal_ids = journals
+
+    @api.onchange('session_id', 'mode')
+    def _onchange_mode(self):
+        if self.journal_id not in self.journal_ids:
+            self.journal_id = self.journal_ids[:1]
+        self._onchange_partner_id()
+
+    @api.onchange('partner_id')
+    def _onchange_partner_id(self):
+        lines = [(5, 0, 0)]
+        if self.partner_id:
+            invoices = self.env['account.invoice'].search(
+                self._get_invoice_domain(), order='date_due, id')
+            lines += [(0, 0, {
+                'invoice_id': invoice.id,
+                'amount': invoice.residual,
+            }) for invoice in invoices]
+        self.line_ids = lines
+
+    @api.multi
+    def _get_invoice_domain(self):
+        self.ensure_one()
+        domain = [
+            ('state', '=', 'open'),
+            ('type', 'in', POS_INVOICE_TYPES[self.mode]),
+            ('company_id', '=', self.session_id.config_id.company_id.id),
+        ]
+        if self.partner_id:
+            domain.append((
+                'commercial_partner_id', '=',
+                self.partner_id.commercial_partner_id.id))
+        return domain
+
+    @api.multi
+    def _get_statement(self):
+        self.ensure_one()
+        return self.session_id._get_journal_statements(self.journal_id)
+
+    @api.multi
+    def _prepare_statement_line_values(self, statement):
+        self.ensure_one()
+        return [
+            line.invoice_id._prepare_pos_statement_line_values(
+                statement, line.amount, self.mode)
+            for line in self.line_ids.filtered('amount')]
+
+    @api.multi
+    def run(self):
+        self.ensure_one()
+        statement = self._get_statement()
+        values = self._prepare_statement_line_values(statement)
+        if not values:
+            raise UserError(_('There is no invoice amount to settle.'))
+        # All the invoices in a single write of the statement
+        statement.write({
+            'line_ids': [(0, 0, line_values) for line_values in values],
+        })
+        return {'type': 'ir.actions.act_window_close'}
+
+
+class PosSessionPayInvoicesLine(models.TransientModel):
+    _name = 'pos.session.pay.invoices.line'
+    _description = 'Invoice paid or collected from a PoS session'
+
+    wizard_id = fields.Many2one(
+        comodel_name='pos.session.pay.invoices',
+        required=True,
+        ondelete='cascade',
+    )
+    invoice_id = fields.Many2one(
+        comodel_name='account.invoice',
+        string='Invoice',
+        required=True,
+    )
+    partner_id = fields.Many2one(
+        related='invoice_id.partner_id',
+        readonly=True,
+    )
+    date_due = fields.Date(
+        related='invoice_id.date_due',
+        readonly=True,
+    )
+    residual = fields.Monetary(
+        related='invoice_id.residual',
+        readonly=True,
+    )
+    currency_id = fields.Many2one(
+        related='invoice_id.currency_id',
+        readonly=True,
+    )
+    amount = fields.Monetary(
+        string='Amount',
+    )
+
+    @api.onchange('invoice_id')
+    def _onchange_invoice_id(self):
+        self.amount = self.invoice_id.residual
@@ -10,6 +10,7 @@ setuptools.setup(
     install_requires=[
         'odoo11-addon-pos_lot_selection',
         'odoo11-addon-pos_order_return',
+        'odoo11-addon-pos_performance_log',
         'odoo11-addon-pos_session_pay_invoice',
     ],
     classifiers=[